@@ -10,26 +10,28 @@ More info in http://design.sphysics.org/
 
 import FreeCAD
 import FreeCADGui
-import glob
 import os
 import sys
-import time
-import pickle
-import threading
+import re
 import traceback
 import subprocess
 import shutil
 from PySide import QtGui, QtCore
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 # Fix FreeCAD not searching in the user-set macro folder.
 try:
     from dsphfc.properties import *
-    from dsphfc import utils, guiutils, xmlimporter, dsphwidgets
+    from dsphfc import utils, guiutils, dsphwidgets
     from dsphfc.utils import __
 except:
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from dsphfc.properties import *
-    from dsphfc import utils, guiutils, xmlimporter, dsphwidgets
+    from dsphfc import utils, guiutils, dsphwidgets
     from dsphfc.utils import __
 
 # Copyright (C) 2017 - Andrés Vieira (anvieiravazquez@gmail.com)
@@ -100,7 +102,24 @@ if not is_compatible:
 # Set QT to UTF-8 encoding
 QtCore.QTextCodec.setCodecForCStrings(QtCore.QTextCodec.codecForName('UTF-8'))
 
+# Precompiled patterns to parse the output of the DualSPHysics tools
+GENCASE_TOTAL_PARTICLES_RE = re.compile(r"Total particles:\s*(\d+)\s*\(bound=")
+EXCEPTION_RE = re.compile(r"exception", re.IGNORECASE)
+RUN_TIMEMAX_RE = re.compile(r"TimeMax=\s*([-+\d.eE]+)")
+RUN_PART_LINE_RE = re.compile(r"\s*Part_\d+\s+(\d+(?:\.\d+)?)")
+RUN_ETA_RE = re.compile(r"(\d+-\d+-\d+\s+\d+:\d+:\d+)\s*$")
+RUN_PARTICLES_OUT_RE = re.compile(r"Particles out:.*\(total:\s*(\d+)\)")
+
+# Transparency applied to an object view for each (fill mode, object type)
+FILLMODE_TRANSPARENCY = {
+    ("full", "fluid"): 30, ("full", "bound"): 0,
+    ("solid", "fluid"): 30, ("solid", "bound"): 0,
+    ("face", "fluid"): 80, ("face", "bound"): 80,
+    ("wire", "fluid"): 85, ("wire", "bound"): 85
+}
+
 # Main data structure
+# data stays a plain dict: saved cases, XML imports and the setup window merge arbitrary keys into it with update().
 data = dict()  # Used to save on disk case parameters and related data
 temp_data = dict()  # Used to store temporal useful items (like processes)
 widget_state_elements = dict()  # Used to store widgets that will be disabled/enabled, so they are centralized
@@ -164,13 +183,21 @@ execparams_button.clicked.connect(lambda: guiutils.def_execparams_window(data))
 widget_state_elements['execparams_button'] = execparams_button
 
 logo_label = QtGui.QLabel()
-logo_label.setPixmap(os.path.dirname(os.path.abspath(__file__)) + "/DSPH_Images/{}".format("logo.png"))
+logo_label.setPixmap(guiutils.IMAGES_PATH + "logo.png")
 
 
 def on_dp_changed():
     """ DP Introduction.
-    Changes the dp at the moment the user changes the text. """
-    data['dp'] = float(dp_input.text())
+    Changes the dp at the moment the user changes the text.
+    Partial input (like "0." or an empty field) is ignored until it is a valid positive number. """
+    dp_text = dp_input.text()
+    # Parse with the same locale the validator uses
+    dp_value, is_number = QtCore.QLocale().toDouble(dp_text)
+    if not is_number:
+        # Text set by the program (str(float)) always uses the C locale format
+        dp_value, is_number = QtCore.QLocale.c().toDouble(dp_text)
+    if is_number and dp_value > 0:
+        data['dp'] = dp_value
 
 
 # DP Introduction layout
@@ -207,6 +234,7 @@ casecontrols_bt_newdoc.setText("  " + __("New\n  Case"))
 casecontrols_bt_newdoc.setToolTip(__("Creates a new case. \nThe opened documents will be closed."))
 casecontrols_bt_newdoc.setIcon(guiutils.get_icon("new.png"))
 casecontrols_bt_newdoc.setIconSize(QtCore.QSize(28, 28))
+widget_state_elements['casecontrols_bt_newdoc'] = casecontrols_bt_newdoc
 
 # Save Case button and dropdown
 casecontrols_bt_savedoc = QtGui.QToolButton()
@@ -229,6 +257,7 @@ casecontrols_bt_loaddoc.setText("  " + __("Load\n  Case"))
 casecontrols_bt_loaddoc.setToolTip(__("Loads a case from disk. All the current documents\nwill be closed."))
 casecontrols_bt_loaddoc.setIcon(guiutils.get_icon("load.png"))
 casecontrols_bt_loaddoc.setIconSize(QtCore.QSize(28, 28))
+widget_state_elements['casecontrols_bt_loaddoc'] = casecontrols_bt_loaddoc
 
 # Add fillbox button
 
@@ -249,6 +278,7 @@ widget_state_elements['casecontrols_bt_addstl'] = casecontrols_bt_addstl
 casecontrols_bt_importxml = QtGui.QPushButton(__("Import XML"))
 casecontrols_bt_importxml.setToolTip(__("Imports an already created XML case from disk."))
 casecontrols_bt_importxml.setEnabled(True)
+widget_state_elements['casecontrols_bt_importxml'] = casecontrols_bt_importxml
 
 # Case summary button
 summary_bt = QtGui.QPushButton(__("Case summary"))
@@ -287,7 +317,7 @@ def on_new_case(prompt=True):
     temp_data.update(new_case_temp_data)
     utils.create_dsph_document()
     guiutils.widget_state_config(widget_state_elements, "new case")
-    data['simobjects']['Case_Limits'] = ["mkspecial", "typespecial", "fillspecial"]
+    data['simobjects']['Case_Limits'] = SimObject("mkspecial", "typespecial", "fillspecial")
     dp_input.setText(str(data["dp"]))
     on_tree_item_selection_change()
 
@@ -311,14 +341,14 @@ def on_save_case(save_as=None):
     # Check if there is any path, a blank one meant the user cancelled the save file dialog
     if save_name != '':
         # Watch if folder already exists or create it
-        if not os.path.exists(save_name):
-            os.makedirs(save_name)
+        utils.ensure_dir(save_name)
+        project_name = os.path.basename(save_name.rstrip('/'))
         data['project_path'] = save_name
-        data['project_name'] = save_name.split('/')[-1]
+        data['project_name'] = project_name
+        data['out_path'] = save_name + "/" + project_name + "_Out/"
 
         # Create out folder for the case
-        if not os.path.exists(save_name + "/" + save_name.split('/')[-1] + "_Out"):
-            os.makedirs(save_name + "/" + save_name.split('/')[-1] + "_Out")
+        utils.ensure_dir(data['out_path'])
 
         # Copy files from movements and change its paths to be inside the project.
         for key, value in data["motion_mks"].iteritems():
@@ -345,7 +375,7 @@ def on_save_case(save_as=None):
             # Export batch files
             utils.batch_generator(
                 full_path=save_name,
-                case_name=save_name.split('/')[-1],
+                case_name=project_name,
                 gcpath=data['gencase_path'],
                 dsphpath=data['dsphysics_path'],
                 pvtkpath=data['partvtk4_path'],
@@ -353,16 +383,23 @@ def on_save_case(save_as=None):
                 lib_path='/'.join(data['gencase_path'].split('/')[:-1]))
 
         # Save data array on disk
-        try:
-            with open(save_name + "/casedata.dsphdata", 'wb') as picklefile:
-                pickle.dump(data, picklefile, utils.PICKLE_PROTOCOL)
-        except Exception as e:
-            traceback.print_exc()
-            guiutils.error_dialog(__("There was a problem saving the DSPH information file (casedata.dsphdata)."))
+        save_case_data()
     else:
         utils.log(__("Saving cancelled."))
 
 
+def save_case_data():
+    """ Dumps the case data structure into the project folder (casedata.dsphdata).
+    Pickle is kept as format: the case holds property and motion objects that JSON can't represent,
+    and there are no particle arrays in it (those stay in the _Out folder, written by DualSPHysics). """
+    try:
+        with open(data['project_path'] + "/casedata.dsphdata", 'wb') as picklefile:
+            pickle.dump(data, picklefile, utils.PICKLE_PROTOCOL)
+    except Exception as e:
+        traceback.print_exc()
+        guiutils.error_dialog(__("There was a problem saving the DSPH information file (casedata.dsphdata)."))
+
+
 def on_save_with_gencase():
     # Check possible size of the case in particles and warn the user if there are too much.
     case_maximum_particles = utils.get_maximum_particles(data['dp'])
@@ -376,56 +413,71 @@ def on_save_with_gencase():
         if max_particle_warning == QtGui.QMessageBox.Cancel:
             return
 
-    # Save Case
+    # Save Case. It is stored as not generated until GenCase succeeds
+    data['gencase_done'] = False
     on_save_case()
 
     # Use gencase if possible to generate the case final definition
-    data['gencase_done'] = False
     if data['gencase_path'] != "":
         os.chdir(data['project_path'])
         process = QtCore.QProcess(fc_main_window)
+
+        # GenCase runs in background. Its results are processed when it finishes.
+        def on_gencase_finished(exit_code):
+            output = str(process.readAllStandardOutput())
+            error_in_gen_case = False
+            guiutils.widget_state_config(widget_state_elements, "gencase finished")
+            # If GenCase was succesful, check for internal errors
+            if exit_code == 0:
+                total_particles_match = GENCASE_TOTAL_PARTICLES_RE.search(output)
+                if total_particles_match:
+                    total_particles = int(total_particles_match.group(1))
+                    data['total_particles'] = total_particles
+                    utils.log(__("Total number of particles exported: ") + str(total_particles))
+                    if total_particles < 300:
+                        utils.warning(
+                            __("Are you sure all the parameters are set right? The number of particles is very low ({}). "
+                               "Lower the DP to increase number of particles").format(str(total_particles)))
+                    elif total_particles > 200000:
+                        utils.warning(__("Number of particles is pretty high ({}) and it could take a lot of time to simulate.").format(str(total_particles)))
+                    data['gencase_done'] = True
+                    guiutils.widget_state_config(widget_state_elements, "gencase done")
+                    # Store GenCase results along with the rest of the case
+                    save_case_data()
+                    guiutils.info_dialog(__("Gencase exported {} particles. Press View Details to check the output.\n").format(str(total_particles)),
+                                         output.split("================================")[1])
+                else:
+                    # Not an expected result. GenCase had a not handled error
+                    error_in_gen_case = True
+
+            if exit_code != 0 or error_in_gen_case:
+                # A previous successful run must not be kept as done for this case
+                guiutils.widget_state_config(widget_state_elements, "gencase not done")
+                save_case_data()
+                # Multiple possible causes. Let the user know
+                with open(data['out_path'] + data['project_name'] + ".out", "rb") as gencase_out_file:
+                    gencase_out = gencase_out_file.read()
+                guiutils.error_dialog(
+                    __("Error executing GenCase. Did you add objects to the case?. Another reason could be memory issues. View details for more info."),
+                    gencase_out.split("================================")[1])
+                utils.warning(__("GenCase Failed."))
+            process.deleteLater()
+
+        # GenCase could not be launched (i.e. wrong executable path). finished won't be emitted.
+        def on_gencase_error(error):
+            if error == QtCore.QProcess.FailedToStart:
+                guiutils.widget_state_config(widget_state_elements, ["gencase finished", "gencase not done"])
+                save_case_data()
+                guiutils.error_dialog(__("Error executing GenCase. Is the path of GenCase correctly placed?"))
+                process.deleteLater()
+
+        process.finished.connect(on_gencase_finished)
+        process.error.connect(on_gencase_error)
+        guiutils.widget_state_config(widget_state_elements, "gencase start")
         process.start(data['gencase_path'], [
-            data['project_path'] + '/' + data['project_name'] + '_Def', data['project_path'] + '/' + data['project_name'] + '_Out/' + data['project_name'],
+            data['project_path'] + '/' + data['project_name'] + '_Def', data['out_path'] + data['project_name'],
             '-save:+all'
         ])
-        process.waitForFinished()
-        output = str(process.readAllStandardOutput())
-        error_in_gen_case = False
-        # If GenCase was succesful, check for internal errors
-        if str(process.exitCode()) == "0":
-            try:
-                total_particles_text = output[output.index("Total particles: "):output.index(" (bound=")]
-                total_particles = int(total_particles_text[total_particles_text.index(": ") + 2:])
-                data['total_particles'] = total_particles
-                utils.log(__("Total number of particles exported: ") + str(total_particles))
-                if total_particles < 300:
-                    utils.warning(
-                        __("Are you sure all the parameters are set right? The number of particles is very low ({}). "
-                           "Lower the DP to increase number of particles").format(str(total_particles)))
-                elif total_particles > 200000:
-                    utils.warning(__("Number of particles is pretty high ({}) and it could take a lot of time to simulate.").format(str(total_particles)))
-                data['gencase_done'] = True
-                guiutils.widget_state_config(widget_state_elements, "gencase done")
-                gencase_infosave_dialog = QtGui.QMessageBox()
-                gencase_infosave_dialog.setText(__("Gencase exported {} particles. Press View Details to check the output.\n").format(str(total_particles)))
-                gencase_infosave_dialog.setDetailedText(output.split("================================")[1])
-                gencase_infosave_dialog.setIcon(QtGui.QMessageBox.Information)
-                gencase_infosave_dialog.exec_()
-            except ValueError:
-                # Not an expected result. GenCase had a not handled error
-                error_in_gen_case = True
-
-        if str(process.exitCode()) != "0" or error_in_gen_case:
-            # Multiple possible causes. Let the user know
-            gencase_out_file = open(data['project_path'] + '/' + data['project_name'] + '_Out/' + data['project_name'] + ".out", "rb")
-            gencase_failed_dialog = QtGui.QMessageBox()
-            gencase_failed_dialog.setText(
-                __("Error executing GenCase. Did you add objects to the case?. Another reason could be memory issues. View details for more info."))
-            gencase_failed_dialog.setDetailedText(gencase_out_file.read().split("================================")[1])
-            gencase_failed_dialog.setIcon(QtGui.QMessageBox.Critical)
-            gencase_out_file.close()
-            gencase_failed_dialog.exec_()
-            utils.warning(__("GenCase Failed."))
 
 
 def on_save_menu(action):
@@ -502,23 +554,25 @@ def on_load_case():
     dp_input.setText(str(data['dp']))
     data['project_path'] = load_path_project_folder
     data['project_name'] = load_path_project_folder.split("/")[-1]
+    data['out_path'] = data['project_path'] + '/' + data['project_name'] + "_Out/"
 
     # Compatibility code. Transform content from previous version to this one.
     # Make FloatProperty compatible
+    data['simobjects'] = utils.simobjects_list_to_simobject(data['simobjects'])
     data['floating_mks'] = utils.float_list_to_float_property(data['floating_mks'])
     data['initials_mks'] = utils.initials_list_to_initials_property(data['initials_mks'])
+    # Used mk groups were stored as lists
+    data['mkboundused'] = set(data['mkboundused'])
+    data['mkfluidused'] = set(data['mkfluidused'])
+    # The loaded objects have not been checked against the opened document yet
+    temp_data['document_signature'] = None
 
     # Adapt widget state to case info
-    guiutils.widget_state_config(widget_state_elements, "load base")
-    if data['gencase_done']:
-        guiutils.widget_state_config(widget_state_elements, "gencase done")
-    else:
-        guiutils.widget_state_config(widget_state_elements, "gencase not done")
-
-    if data['simulation_done']:
-        guiutils.widget_state_config(widget_state_elements, "simulation done")
-    else:
-        guiutils.widget_state_config(widget_state_elements, "simulation not done")
+    guiutils.widget_state_config(widget_state_elements, [
+        "load base",
+        "gencase done" if data['gencase_done'] else "gencase not done",
+        "simulation done" if data['simulation_done'] else "simulation not done"
+    ])
 
     # Check executable paths
     os.chdir(data['project_path'])
@@ -555,9 +609,8 @@ def on_add_fillbox():
 def on_add_stl():
     """ Add STL file. Opens a file opener and allows
     the user to set parameters for the import process"""
-    filedialog = QtGui.QFileDialog()
     # noinspection PyArgumentList
-    file_name, _ = filedialog.getOpenFileName(fc_main_window, __("Select STL to import"), QtCore.QDir.homePath(), "STL Files (*.stl)")
+    file_name, _ = QtGui.QFileDialog.getOpenFileName(fc_main_window, __("Select STL to import"), QtCore.QDir.homePath(), "STL Files (*.stl)")
     # Defines import stl dialog
     stl_dialog = QtGui.QDialog()
     stl_dialog.setModal(True)
@@ -643,7 +696,7 @@ def on_add_stl():
 
     def stl_dialog_browse():
         # noinspection PyArgumentList
-        file_name_temp, _ = filedialog.getOpenFileName(fc_main_window, __("Select STL to import"), QtCore.QDir.homePath(), "STL Files (*.stl)")
+        file_name_temp, _ = QtGui.QFileDialog.getOpenFileName(fc_main_window, __("Select STL to import"), QtCore.QDir.homePath(), "STL Files (*.stl)")
         stl_file_path.setText(file_name_temp)
         stl_dialog.raise_()
         stl_dialog.activateWindow()
@@ -677,6 +730,8 @@ def on_import_xml():
                 return
         else:
             on_new_case()
+        # Imported on demand: the XML parser is not needed to show the dock.
+        from dsphfc import xmlimporter
         config, objects = xmlimporter.import_xml_file(import_name)
 
         # Set Config
@@ -696,33 +751,34 @@ def on_import_xml():
         # Add results to DSPH objects
         for key, value in objects.iteritems():
             add_object_to_sim(key)
+            value = SimObject(*value)
             data['simobjects'][key] = value
             # Change visual properties based on fill mode and type
             target_object = FreeCADGui.ActiveDocument.getObject(key)
-            if "bound" in value[1]:
-                if "full" in value[2]:
+            if "bound" in value.type:
+                if "full" in value.fill:
                     target_object.ShapeColor = (0.80, 0.80, 0.80)
                     target_object.Transparency = 0
-                elif "solid" in value[2]:
+                elif "solid" in value.fill:
                     target_object.ShapeColor = (0.80, 0.80, 0.80)
                     target_object.Transparency = 0
-                elif "face" in value[2]:
+                elif "face" in value.fill:
                     target_object.ShapeColor = (0.80, 0.80, 0.80)
                     target_object.Transparency = 80
-                elif "wire" in value[2]:
+                elif "wire" in value.fill:
                     target_object.ShapeColor = (0.80, 0.80, 0.80)
                     target_object.Transparency = 85
-            if "fluid" in value[1]:
-                if "full" in value[2]:
+            if "fluid" in value.type:
+                if "full" in value.fill:
                     target_object.ShapeColor = (0.00, 0.45, 1.00)
                     target_object.Transparency = 30
-                elif "solid" in value[2]:
+                elif "solid" in value.fill:
                     target_object.ShapeColor = (0.00, 0.45, 1.00)
                     target_object.Transparency = 30
-                elif "face" in value[2]:
+                elif "face" in value.fill:
                     target_object.ShapeColor = (0.00, 0.45, 1.00)
                     target_object.Transparency = 80
-                elif "wire" in value[2]:
+                elif "wire" in value.fill:
                     target_object.ShapeColor = (0.00, 0.45, 1.00)
                     target_object.Transparency = 85
 
@@ -928,6 +984,10 @@ cc_layout.addLayout(ccsecondrow)
 # Defines run window dialog
 run_dialog = QtGui.QDialog(None, QtCore.Qt.CustomizeWindowHint | QtCore.Qt.WindowTitleHint)
 run_watcher = QtCore.QFileSystemWatcher()
+# Coalesces bursts of filesystem notifications into one run data update
+run_fs_timer = QtCore.QTimer(run_dialog)
+run_fs_timer.setSingleShot(True)
+run_fs_timer.setInterval(200)
 
 # Title and size
 run_dialog.setModal(False)
@@ -990,6 +1050,13 @@ run_details_layout.addWidget(run_details_text)
 run_details.setLayout(run_details_layout)
 
 
+def stop_run_watcher():
+    """ Stops watching every path (out directory and/or Run.out) of the simulation monitor. """
+    watched_paths = run_watcher.files() + run_watcher.directories()
+    if watched_paths:
+        run_watcher.removePaths(watched_paths)
+
+
 def on_ex_simulate():
     """ Defines what happens on simulation button press.
     It shows the run window and starts a background process
@@ -1011,6 +1078,7 @@ def on_ex_simulate():
         utils.log(__("Stopping simulation"))
         if temp_data['current_process'] is not None:
             temp_data['current_process'].kill()
+        run_fs_timer.stop()
         run_dialog.hide()
         run_details.hide()
         data['simulation_done'] = False
@@ -1037,15 +1105,24 @@ def on_ex_simulate():
     run_button_details.clicked.connect(on_details)
 
     # Launch simulation and watch filesystem to monitor simulation
-    filelist = [f for f in os.listdir(data['project_path'] + '/' + data['project_name'] + "_Out/") if f.startswith("Part")]
-    for f in filelist:
-        os.remove(data['project_path'] + '/' + data['project_name'] + "_Out/" + f)
+    try:
+        out_file_names = os.listdir(data['out_path'])
+    except OSError:
+        out_file_names = list()
+    for out_file_name in out_file_names:
+        if not out_file_name.startswith("Part"):
+            continue
+        try:
+            os.unlink(data['out_path'] + out_file_name)
+        except OSError:
+            pass
 
     # Simulation finished handler
     def on_dsph_sim_finished(exit_code):
         # Reads output and completes the progress bar
-        output = temp_data['current_process'].readAllStandardOutput()
-        run_watcher.removePath(data['project_path'] + '/' + data['project_name'] + "_Out/")
+        output = str(temp_data['current_process'].readAllStandardOutput())
+        stop_run_watcher()
+        run_fs_timer.stop()
         run_dialog.setWindowTitle(__("DualSPHysics Simulation: Complete"))
         run_progbar_bar.setValue(100)
         run_button_cancel.setText(__("Close"))
@@ -1056,93 +1133,149 @@ def on_ex_simulate():
             guiutils.widget_state_config(widget_state_elements, "sim finished")
         else:
             # In case of an error
-            if "exception" in str(output).lower():
+            if EXCEPTION_RE.search(output):
                 utils.error(__("Exception in execution."))
                 run_dialog.setWindowTitle(__("DualSPHysics Simulation: Error"))
                 run_progbar_bar.setValue(0)
                 run_dialog.hide()
                 guiutils.widget_state_config(widget_state_elements, "sim error")
-                execution_error_dialog = QtGui.QMessageBox()
-                execution_error_dialog.setText(
+                guiutils.error_dialog(
                     __("There was an error in execution. Make sure you set the parameters right (and they exist). "
-                       "Also, make sure that your computer has the right hardware to simulate. Check the details for more information."))
-                execution_error_dialog.setDetailedText(str(output).split("================================")[1])
-                execution_error_dialog.setIcon(QtGui.QMessageBox.Critical)
-                execution_error_dialog.exec_()
+                       "Also, make sure that your computer has the right hardware to simulate. Check the details for more information."),
+                    output.split("================================")[1])
 
     # Launches a QProcess in background
     process = QtCore.QProcess(run_dialog)
     process.finished.connect(on_dsph_sim_finished)
     temp_data['current_process'] = process
     static_params_exe = [
-        data['project_path'] + '/' + data['project_name'] + "_Out/" + data['project_name'], data['project_path'] + '/' + data['project_name'] + "_Out/",
+        data['out_path'] + data['project_name'], data['out_path'],
         "-svres", "-" + str(ex_selector_combo.currentText()).lower()
     ]
-    if len(data['additional_parameters']) < 2:
-        additional_params_ex = list()
-    else:
-        additional_params_ex = data['additional_parameters'].split(" ")
-    final_params_ex = static_params_exe + additional_params_ex
+    final_params_ex = static_params_exe + get_additional_parameters_tokens()
     temp_data['current_process'].start(data['dsphysics_path'], final_params_ex)
 
+    # Run.out is read incrementally. Only the bytes appended since the last change are processed.
+    run_out_path = data['out_path'] + "Run.out"
+    temp_data['run_out_pos'] = 0
+    run_details_text.setText("")
+
     # Executed each time filesystem changes. Updates run data
     def on_fs_change():
-        run_file_data = ''
         try:
-            with open(data['project_path'] + '/' + data['project_name'] + "_Out/Run.out", "r") as run_file:
-                run_file_data = run_file.readlines()
-        except Exception as e:
-            pass
+            with open(run_out_path, "rb") as run_file:
+                run_file.seek(0, os.SEEK_END)
+                if run_file.tell() < temp_data['run_out_pos']:
+                    # Run.out was rewritten. Start over
+                    temp_data['run_out_pos'] = 0
+                    run_details_text.setText("")
+                run_file.seek(temp_data['run_out_pos'])
+                run_file_data = run_file.read()
+        except (IOError, OSError):
+            # Run.out not created yet or being replaced. Next change will catch up.
+            return
+
+        # Consume only complete lines. A line still being written is read again on the next change.
+        consumed = run_file_data.rfind("\n") + 1
+        if consumed == 0:
+            return
+        run_file_data = run_file_data[:consumed].replace("\r", "")
+        temp_data['run_out_pos'] += consumed
 
         # Fill details window
-        run_details_text.setText("".join(run_file_data))
+        run_details_text.moveCursor(QtGui.QTextCursor.End)
+        run_details_text.insertPlainText(run_file_data)
         run_details_text.moveCursor(QtGui.QTextCursor.End)
 
+        run_file_lines = run_file_data.splitlines()
+        last_line = run_file_lines[-1]
+
         # Set percentage scale based on timemax
-        for l in run_file_data:
-            if data['timemax'] == -1:
-                if "TimeMax=" in l:
-                    data['timemax'] = float(l.split("=")[1])
+        if data['timemax'] == -1:
+            timemax_match = RUN_TIMEMAX_RE.search(run_file_data)
+            if timemax_match:
+                try:
+                    data['timemax'] = float(timemax_match.group(1))
+                except ValueError:
+                    pass
 
         # Check how much of the simulation is done and fill estimated time
-        if "Part_" in run_file_data[-1]:
-            last_line_parttime = run_file_data[-1].split(".")
-            if "Part_" in last_line_parttime[0]:
-                current_value = (float(last_line_parttime[0].split(" ")[-1] + "." + last_line_parttime[1][:2]) * float(100)) / float(data['timemax'])
+        part_match = RUN_PART_LINE_RE.match(last_line)
+        if part_match:
+            if data['timemax'] > 0:
+                current_value = (float(part_match.group(1)) * float(100)) / float(data['timemax'])
                 run_progbar_bar.setValue(current_value)
                 run_dialog.setWindowTitle(__("DualSPHysics Simulation: {}%").format(str(format(current_value, ".2f"))))
 
-            last_line_time = run_file_data[-1].split("  ")[-1]
-            if ("===" not in last_line_time) and ("CellDiv" not in last_line_time) and ("memory" not in last_line_time) and ("-" in last_line_time):
+            eta_match = RUN_ETA_RE.search(last_line)
+            if eta_match:
                 # Update time field
-                try:
-                    run_group_label_eta.setText(__("Estimated time to complete simulation: ") + last_line_time)
-                except RuntimeError:
-                    run_group_label_eta.setText(__("Estimated time to complete simulation: ") + "Calculating...")
-        elif "Particles out:" in run_file_data[-1]:
-            totalpartsout = int(run_file_data[-1].split("(total: ")[1].split(")")[0])
-            data['total_particles_out'] = totalpartsout
-            run_group_label_partsout.setText(__("Total particles out: {}").format(str(data['total_particles_out'])))
-
-    # Set filesystem watcher to the out directory.
-    run_watcher.addPath(data['project_path'] + '/' + data['project_name'] + "_Out/")
-    run_watcher.directoryChanged.connect(on_fs_change)
+                run_group_label_eta.setText(__("Estimated time to complete simulation: ") + eta_match.group(1))
+        else:
+            parts_out_match = RUN_PARTICLES_OUT_RE.search(last_line)
+            if parts_out_match:
+                data['total_particles_out'] = int(parts_out_match.group(1))
+                run_group_label_partsout.setText(__("Total particles out: {}").format(str(data['total_particles_out'])))
+
+    # Filesystem notifications only start the update timer, so a burst of Part files triggers a single update.
+    def on_fs_notify(path):
+        if run_out_path not in run_watcher.files():
+            if os.path.isfile(run_out_path):
+                # Watch Run.out itself from now on. The out directory changes with every Part file written.
+                if run_watcher.directories():
+                    run_watcher.removePath(data['out_path'])
+                run_watcher.addPath(run_out_path)
+            elif not run_watcher.directories():
+                # Run.out was replaced. Watch the directory until it is created again
+                run_watcher.addPath(data['out_path'])
+        if not run_fs_timer.isActive():
+            run_fs_timer.start()
+
+    # Ensure the watcher and the timer have no connections from previous runs
+    try:
+        run_watcher.directoryChanged.disconnect()
+    except RuntimeError:
+        pass
+    try:
+        run_watcher.fileChanged.disconnect()
+    except RuntimeError:
+        pass
+    try:
+        run_fs_timer.timeout.disconnect()
+    except RuntimeError:
+        pass
+
+    run_fs_timer.timeout.connect(on_fs_change)
+
+    # Set filesystem watcher to the out directory. It is swapped for Run.out once that file is created.
+    stop_run_watcher()
+    run_watcher.addPath(data['out_path'])
+    run_watcher.directoryChanged.connect(on_fs_notify)
+    run_watcher.fileChanged.connect(on_fs_notify)
 
     # Handle error on simulation start
     if temp_data['current_process'].state() == QtCore.QProcess.NotRunning:
         # Probably error happened.
-        run_watcher.removePath(data['project_path'] + '/' + data['project_name'] + "_Out/")
+        stop_run_watcher()
         temp_data['current_process'] = ""
-        exec_not_correct_dialog = QtGui.QMessageBox()
-        exec_not_correct_dialog.setText(__("Error on simulation start. Is the path of DualSPHysics correctly placed?"))
-        exec_not_correct_dialog.setIcon(QtGui.QMessageBox.Critical)
-        exec_not_correct_dialog.exec_()
+        guiutils.error_dialog(__("Error on simulation start. Is the path of DualSPHysics correctly placed?"))
     else:
         run_dialog.show()
 
 
-def on_additional_parameters():
-    """ Handles additional parameters button for execution """
+def get_additional_parameters_tokens():
+    """ Returns the additional execution parameters split as arguments.
+    The split is cached and only redone when the parameters string changes. """
+    cached = temp_data.get('additional_parameters_tokens')
+    if cached is None or cached[0] != data['additional_parameters']:
+        cached = (data['additional_parameters'], utils.split_parameters(data['additional_parameters']))
+        temp_data['additional_parameters_tokens'] = cached
+    return list(cached[1])
+
+
+def build_additional_parameters_window():
+    """ Builds the additional parameters dialog for execution.
+    Returns the dialog and its parameters input. """
     additional_parameters_window = QtGui.QDialog()
     additional_parameters_window.setWindowTitle(__("Additional parameters"))
 
@@ -1152,6 +1285,7 @@ def on_additional_parameters():
     # Ok Button handler
     def on_ok():
         data['additional_parameters'] = export_params.text()
+        get_additional_parameters_tokens()
         additional_parameters_window.accept()
 
     # Cancel Button handler
@@ -1170,7 +1304,6 @@ def on_additional_parameters():
     paramintro_layout = QtGui.QHBoxLayout()
     paramintro_label = QtGui.QLabel(__("Additional Parameters: "))
     export_params = QtGui.QLineEdit()
-    export_params.setText(data['additional_parameters'])
     paramintro_layout.addWidget(paramintro_label)
     paramintro_layout.addWidget(export_params)
 
@@ -1181,7 +1314,16 @@ def on_additional_parameters():
 
     additional_parameters_window.setFixedSize(600, 110)
     additional_parameters_window.setLayout(additional_parameters_layout)
-    additional_parameters_window.exec_()
+    return additional_parameters_window, export_params
+
+
+def on_additional_parameters():
+    """ Handles additional parameters button for execution.
+    The dialog is built on first use and reused afterwards. """
+    if temp_data.get('additional_parameters_window') is None:
+        temp_data['additional_parameters_window'], temp_data['additional_parameters_input'] = build_additional_parameters_window()
+    temp_data['additional_parameters_input'].setText(data['additional_parameters'])
+    temp_data['additional_parameters_window'].exec_()
 
 
 # Execution section scaffolding
@@ -1247,6 +1389,62 @@ export_dialog_layout.addLayout(export_button_layout)
 
 export_dialog.setLayout(export_dialog_layout)
 
+# Receives the number of parts to export, counted outside the GUI thread
+export_parts_notifier = guiutils.PartCountNotifier()
+
+
+def on_export_parts_counted(request_id, total_parts):
+    """ Adjusts the export progress bar once the number of parts is known.
+    Counts from a previous export, or arriving after the export finished, are ignored. """
+    if request_id != temp_data.get('export_count_request') or not export_dialog.isVisible():
+        return
+    temp_data['total_export_parts'] = total_parts
+    export_progbar_bar.setRange(0, total_parts)
+
+
+export_parts_notifier.counted.connect(on_export_parts_counted)
+
+# Coalesces the progress reported by the export tools, so the dialog repaints at most every 50 ms
+export_progress_timer = QtCore.QTimer(export_dialog)
+export_progress_timer.setSingleShot(True)
+export_progress_timer.setInterval(50)
+
+
+def queue_export_progress(current_part):
+    """ Stores the last part reported by an export tool and schedules a progress update. """
+    temp_data['pending_export_part'] = current_part
+    if not export_progress_timer.isActive():
+        export_progress_timer.start()
+
+
+def apply_export_progress():
+    """ Shows the last part reported by an export tool on the export dialog. """
+    current_part = temp_data.pop('pending_export_part', None)
+    if current_part is None:
+        return
+    export_progbar_bar.setValue(current_part)
+    if temp_data['total_export_parts'] < 0:
+        # Total still being counted
+        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part))
+    else:
+        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+
+
+export_progress_timer.timeout.connect(apply_export_progress)
+
+
+def start_export_progress():
+    """ Resets the export progress bar and starts counting the parts to export in background.
+    The bar shows as busy until the count arrives, so the export can start right away. """
+    export_progress_timer.stop()
+    temp_data.pop('pending_export_part', None)
+    temp_data['total_export_parts'] = -1
+    export_progbar_bar.setRange(0, 0)
+    export_progbar_bar.setValue(0)
+    export_dialog.setWindowTitle(__("Exporting: ") + "0")
+    temp_data['export_count_request'] = temp_data.get('export_count_request', 0) + 1
+    guiutils.count_parts_in_background(data['out_path'], export_parts_notifier, temp_data['export_count_request'])
+
 
 def partvtk_export(export_parameters):
     """ Export VTK button behaviour.
@@ -1255,11 +1453,7 @@ def partvtk_export(export_parameters):
     widget_state_elements['post_proc_partvtk_button'].setText("Exporting...")
 
     # Find total export parts and adjust progress bar
-    partfiles = glob.glob(data['project_path'] + '/' + data['project_name'] + "_Out/" + "Part_*.bi4")
-    for filename in partfiles:
-        temp_data['total_export_parts'] = max(int(filename.split("Part_")[1].split(".bi4")[0]), temp_data['total_export_parts'])
-    export_progbar_bar.setRange(0, temp_data['total_export_parts'])
-    export_progbar_bar.setValue(0)
+    start_export_progress()
 
     export_dialog.show()
 
@@ -1314,8 +1508,8 @@ def partvtk_export(export_parameters):
 
     # Build parameters
     static_params_exp = [
-        '-dirin ' + data['project_path'] + '/' + data['project_name'] + '_Out/',
-        save_mode + data['project_path'] + '/' + data['project_name'] + '_Out/' + export_parameters['file_name'],
+        '-dirin ' + data['out_path'],
+        save_mode + data['out_path'] + export_parameters['file_name'],
         '-onlytype:' + export_parameters['save_types'] + export_parameters['additional_parameters']
     ]
 
@@ -1328,18 +1522,10 @@ def partvtk_export(export_parameters):
         # Update progress bar
         current_output = str(temp_data['current_export_process'].readAllStandardOutput())
         temp_data['current_output'] += current_output
-        try:
-            current_part = current_output.split("{}_".format(export_parameters['file_name']))[1]
-            if export_parameters['save_mode'] == 0:
-                current_part = int(current_part.split(".vtk")[0])
-            elif export_parameters['save_mode'] == 1:
-                current_part = int(current_part.split(".csv")[0])
-            elif export_parameters['save_mode'] == 2:
-                current_part = int(current_part.split(".asc")[0])
-        except IndexError:
-            current_part = export_progbar_bar.value()
-        export_progbar_bar.setValue(current_part)
-        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+        extension = {0: ".vtk", 1: ".csv", 2: ".asc"}.get(export_parameters['save_mode'], ".vtk")
+        current_part = utils.get_last_part_in_output(current_output, "{}_".format(export_parameters['file_name']), extension)
+        if current_part is not None:
+            queue_export_progress(current_part)
 
     temp_data['current_export_process'].readyReadStandardOutput.connect(on_stdout_ready)
 
@@ -1491,11 +1677,7 @@ def floatinginfo_export(export_parameters):
     widget_state_elements['post_proc_floatinginfo_button'].setText("Exporting...")
 
     # Find total export parts
-    partfiles = glob.glob(data['project_path'] + '/' + data['project_name'] + "_Out/" + "Part_*.bi4")
-    for filename in partfiles:
-        temp_data['total_export_parts'] = max(int(filename.split("Part_")[1].split(".bi4")[0]), temp_data['total_export_parts'])
-    export_progbar_bar.setRange(0, temp_data['total_export_parts'])
-    export_progbar_bar.setValue(0)
+    start_export_progress()
 
     export_dialog.show()
 
@@ -1526,8 +1708,8 @@ def floatinginfo_export(export_parameters):
     export_process.finished.connect(on_export_finished)
 
     static_params_exp = [
-        '-filexml ' + data['project_path'] + '/' + data['project_name'] + '_Out/' + data['project_name'] + '.xml', '-savemotion',
-        '-savedata ' + data['project_path'] + '/' + data['project_name'] + '_Out/' + export_parameters['filename'], export_parameters['additional_parameters']
+        '-filexml ' + data['out_path'] + data['project_name'] + '.xml', '-savemotion',
+        '-savedata ' + data['out_path'] + export_parameters['filename'], export_parameters['additional_parameters']
     ]
 
     if len(export_parameters['onlymk']) > 0:
@@ -1540,12 +1722,9 @@ def floatinginfo_export(export_parameters):
         # update progress bar
         current_output = str(temp_data['current_export_process'].readAllStandardOutput())
         temp_data['current_output'] += current_output
-        try:
-            current_part = current_output.split("Part_")[1].split("  ")[0]
-        except IndexError:
-            current_part = export_progbar_bar.value()
-        export_progbar_bar.setValue(int(current_part))
-        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+        current_part = utils.get_last_part_in_output(current_output, "Part_", "  ")
+        if current_part is not None:
+            queue_export_progress(current_part)
 
     temp_data['current_export_process'].readyReadStandardOutput.connect(on_stdout_ready)
 
@@ -1616,11 +1795,7 @@ def computeforces_export(export_parameters):
     widget_state_elements['post_proc_computeforces_button'].setText("Exporting...")
 
     # Find total export parts
-    partfiles = glob.glob(data['project_path'] + '/' + data['project_name'] + "_Out/" + "Part_*.bi4")
-    for filename in partfiles:
-        temp_data['total_export_parts'] = max(int(filename.split("Part_")[1].split(".bi4")[0]), temp_data['total_export_parts'])
-    export_progbar_bar.setRange(0, temp_data['total_export_parts'])
-    export_progbar_bar.setValue(0)
+    start_export_progress()
 
     export_dialog.show()
 
@@ -1659,9 +1834,9 @@ def computeforces_export(export_parameters):
         save_mode = '-saveascii '
 
     static_params_exp = [
-        '-dirin ' + data['project_path'] + '/' + data['project_name'] + '_Out/',
-        '-filexml ' + data['project_path'] + '/' + data['project_name'] + '_Out/' + data['project_name'] + '.xml',
-        save_mode + data['project_path'] + '/' + data['project_name'] + '_Out/' + export_parameters['filename'], export_parameters['additional_parameters']
+        '-dirin ' + data['out_path'],
+        '-filexml ' + data['out_path'] + data['project_name'] + '.xml',
+        save_mode + data['out_path'] + export_parameters['filename'], export_parameters['additional_parameters']
     ]
 
     if len(export_parameters['onlymk']) > 0:
@@ -1674,12 +1849,9 @@ def computeforces_export(export_parameters):
         # update progress bar
         current_output = str(temp_data['current_export_process'].readAllStandardOutput())
         temp_data['current_output'] += current_output
-        try:
-            current_part = current_output.split("Part_")[1].split(".bi4")[0]
-        except IndexError:
-            current_part = export_progbar_bar.value()
-        export_progbar_bar.setValue(int(current_part))
-        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+        current_part = utils.get_last_part_in_output(current_output, "Part_", ".bi4")
+        if current_part is not None:
+            queue_export_progress(current_part)
 
     temp_data['current_export_process'].readyReadStandardOutput.connect(on_stdout_ready)
 
@@ -1760,11 +1932,7 @@ def measuretool_export(export_parameters):
     widget_state_elements['post_proc_measuretool_button'].setText("Exporting...")
 
     # Find total export parts
-    partfiles = glob.glob(data['project_path'] + '/' + data['project_name'] + "_Out/" + "Part_*.bi4")
-    for filename in partfiles:
-        temp_data['total_export_parts'] = max(int(filename.split("Part_")[1].split(".bi4")[0]), temp_data['total_export_parts'])
-    export_progbar_bar.setRange(0, temp_data['total_export_parts'])
-    export_progbar_bar.setValue(0)
+    start_export_progress()
 
     export_dialog.show()
 
@@ -1819,9 +1987,9 @@ def measuretool_export(export_parameters):
     calculate_height = '-height' if export_parameters['calculate_water_elevation'] else ''
 
     static_params_exp = [
-        '-dirin ' + data['project_path'] + '/' + data['project_name'] + '_Out/',
-        '-filexml ' + data['project_path'] + '/' + data['project_name'] + '_Out/' + data['project_name'] + '.xml',
-        save_mode + data['project_path'] + '/' + data['project_name'] + '_Out/' + export_parameters['filename'],
+        '-dirin ' + data['out_path'],
+        '-filexml ' + data['out_path'] + data['project_name'] + '.xml',
+        save_mode + data['out_path'] + export_parameters['filename'],
         '-points ' + data['project_path'] + '/points.txt', '-vars:' + export_parameters['save_vars'], calculate_height,
         export_parameters['additional_parameters']
     ]
@@ -1833,12 +2001,9 @@ def measuretool_export(export_parameters):
         # update progress bar
         current_output = str(temp_data['current_export_process'].readAllStandardOutput())
         temp_data['current_output'] += current_output
-        try:
-            current_part = current_output.split("/Part_")[1].split(".bi4")[0]
-        except IndexError:
-            current_part = export_progbar_bar.value()
-        export_progbar_bar.setValue(int(current_part))
-        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+        current_part = utils.get_last_part_in_output(current_output, "/Part_", ".bi4")
+        if current_part is not None:
+            queue_export_progress(current_part)
 
     temp_data['current_export_process'].readyReadStandardOutput.connect(on_stdout_ready)
 
@@ -2154,11 +2319,7 @@ def isosurface_export(export_parameters):
     widget_state_elements['post_proc_isosurface_button'].setText("Exporting...")
 
     # Find total export parts and adjust progress bar
-    partfiles = glob.glob(data['project_path'] + '/' + data['project_name'] + "_Out/" + "Part_*.bi4")
-    for filename in partfiles:
-        temp_data['total_export_parts'] = max(int(filename.split("Part_")[1].split(".bi4")[0]), temp_data['total_export_parts'])
-    export_progbar_bar.setRange(0, temp_data['total_export_parts'])
-    export_progbar_bar.setValue(0)
+    start_export_progress()
 
     export_dialog.show()
 
@@ -2194,8 +2355,8 @@ def isosurface_export(export_parameters):
 
     # Build parameters
     static_params_exp = [
-        '-dirin ' + data['project_path'] + '/' + data['project_name'] + '_Out/',
-        '-saveiso ' + data['project_path'] + '/' + data['project_name'] + '_Out/' + export_parameters['file_name'],
+        '-dirin ' + data['out_path'],
+        '-saveiso ' + data['out_path'] + export_parameters['file_name'],
         '-onlytype:' + export_parameters['save_types'] + export_parameters['additional_parameters']
     ]
 
@@ -2208,13 +2369,9 @@ def isosurface_export(export_parameters):
         # Update progress bar
         current_output = str(temp_data['current_export_process'].readAllStandardOutput())
         temp_data['current_output'] += current_output
-        try:
-            current_part = current_output.split("{}_".format(export_parameters['file_name']))[1]
-            current_part = int(current_part.split(".vtk")[0])
-        except IndexError:
-            current_part = export_progbar_bar.value()
-        export_progbar_bar.setValue(current_part)
-        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+        current_part = utils.get_last_part_in_output(current_output, "{}_".format(export_parameters['file_name']), ".vtk")
+        if current_part is not None:
+            queue_export_progress(current_part)
 
     temp_data['current_export_process'].readyReadStandardOutput.connect(on_stdout_ready)
 
@@ -2353,11 +2510,7 @@ def boundaryvtk_export(export_parameters):
     widget_state_elements['post_proc_boundaryvtk_button'].setText("Exporting...")
 
     # Find total export parts and adjust progress bar
-    partfiles = glob.glob(data['project_path'] + '/' + data['project_name'] + "_Out/" + "Part_*.bi4")
-    for filename in partfiles:
-        temp_data['total_export_parts'] = max(int(filename.split("Part_")[1].split(".bi4")[0]), temp_data['total_export_parts'])
-    export_progbar_bar.setRange(0, temp_data['total_export_parts'])
-    export_progbar_bar.setValue(0)
+    start_export_progress()
 
     export_dialog.show()
 
@@ -2393,8 +2546,8 @@ def boundaryvtk_export(export_parameters):
 
     # Build parameters
     static_params_exp = [
-        '-dirin ' + data['project_path'] + '/' + data['project_name'] + '_Out/',
-        '-saveiso ' + data['project_path'] + '/' + data['project_name'] + '_Out/' + export_parameters['file_name'],
+        '-dirin ' + data['out_path'],
+        '-saveiso ' + data['out_path'] + export_parameters['file_name'],
         '-onlytype:' + export_parameters['save_types'] + export_parameters['additional_parameters']
     ]
 
@@ -2407,13 +2560,9 @@ def boundaryvtk_export(export_parameters):
         # Update progress bar
         current_output = str(temp_data['current_export_process'].readAllStandardOutput())
         temp_data['current_output'] += current_output
-        try:
-            current_part = current_output.split("{}_".format(export_parameters['file_name']))[1]
-            current_part = int(current_part.split(".vtk")[0])
-        except IndexError:
-            current_part = export_progbar_bar.value()
-        export_progbar_bar.setValue(current_part)
-        export_dialog.setWindowTitle(__("Exporting: ") + str(current_part) + "/" + str(temp_data['total_export_parts']))
+        current_part = utils.get_last_part_in_output(current_output, "{}_".format(export_parameters['file_name']), ".vtk")
+        if current_part is not None:
+            queue_export_progress(current_part)
 
     temp_data['current_export_process'].readyReadStandardOutput.connect(on_stdout_ready)
 
@@ -2646,9 +2795,6 @@ guiutils.widget_state_config(widget_state_elements, "no case")
 dsph_main_dock_scaff_widget.setLayout(main_layout)
 dsph_main_dock.setWidget(dsph_main_dock_scaff_widget)
 
-# And docking it at right side of screen
-fc_main_window.addDockWidget(QtCore.Qt.RightDockWidgetArea, dsph_main_dock)
-
 # DSPH OBJECT PROPERTIES DOCK RELATED CODE
 # ----------------------------
 # Tries to find and close previous instances of the widget.
@@ -2707,36 +2853,31 @@ material_label.setToolTip(__("Sets material for this object"))
 motion_label = QtGui.QLabel("   {}".format(__("Motion")))
 motion_label.setToolTip(__("Sets motion for this object"))
 
-mkgroup_label.setAlignment(QtCore.Qt.AlignLeft)
-material_label.setAlignment(QtCore.Qt.AlignLeft)
-objtype_label.setAlignment(QtCore.Qt.AlignLeft)
-fillmode_label.setAlignment(QtCore.Qt.AlignLeft)
-floatstate_label.setAlignment(QtCore.Qt.AlignLeft)
-initials_label.setAlignment(QtCore.Qt.AlignLeft)
-motion_label.setAlignment(QtCore.Qt.AlignLeft)
+# Property name labels, in the same order as the rows of the property table
+object_property_labels = (objtype_label, mkgroup_label, fillmode_label, floatstate_label, initials_label, motion_label)
 
-object_property_table.setCellWidget(0, 0, objtype_label)
-object_property_table.setCellWidget(1, 0, mkgroup_label)
-object_property_table.setCellWidget(2, 0, fillmode_label)
-object_property_table.setCellWidget(3, 0, floatstate_label)
-object_property_table.setCellWidget(4, 0, initials_label)
-object_property_table.setCellWidget(5, 0, motion_label)
+material_label.setAlignment(QtCore.Qt.AlignLeft)
+for property_row, property_label in enumerate(object_property_labels):
+    property_label.setAlignment(QtCore.Qt.AlignLeft)
+    object_property_table.setCellWidget(property_row, 0, property_label)
 
 
 def mkgroup_change(value):
     """ Defines what happens when MKGroup is changed. """
     selection = FreeCADGui.Selection.getSelection()[0]
-    data['simobjects'][selection.Name][0] = value
+    data['simobjects'][selection.Name].mk = value
 
 
 def objtype_change(index):
     """ Defines what happens when type of object is changed """
-    selection = FreeCADGui.Selection.getSelection()[0]
-    selectiongui = FreeCADGui.getDocument("DSPH_Case").getObject(selection.Name)
+    name = FreeCADGui.Selection.getSelection()[0].Name
+    sim_object = data['simobjects'][name]
+    selectiongui = FreeCADGui.getDocument("DSPH_Case").getObject(name)
+    new_type = objtype_prop.itemText(index)
 
-    if objtype_prop.itemText(index).lower() == "bound":
+    if new_type.lower() == "bound":
         mkgroup_prop.setRange(0, 240)
-        if data['simobjects'][selection.Name][1].lower() != "bound":
+        if not sim_object.is_bound:
             mkgroup_prop.setValue(int(utils.get_first_mk_not_used("bound", data)))
         try:
             selectiongui.ShapeColor = (0.80, 0.80, 0.80)
@@ -2747,9 +2888,9 @@ def objtype_change(index):
         floatstate_prop.setEnabled(True)
         initials_prop.setEnabled(False)
         mkgroup_label.setText("&nbsp;&nbsp;&nbsp;" + __("MKBound") + " <a href='http://design.sphysics.org/wiki/doku.php?id=concepts'>?</a>")
-    elif objtype_prop.itemText(index).lower() == "fluid":
+    elif new_type.lower() == "fluid":
         mkgroup_prop.setRange(0, 10)
-        if data['simobjects'][selection.Name][1].lower() != "fluid":
+        if not sim_object.is_fluid:
             mkgroup_prop.setValue(int(utils.get_first_mk_not_used("fluid", data)))
         try:
             selectiongui.ShapeColor = (0.00, 0.45, 1.00)
@@ -2758,122 +2899,67 @@ def objtype_change(index):
             # Can't change attributes
             pass
         # Remove floating properties if it is changed to fluid
-        if str(data['simobjects'][selection.Name][0]) in data['floating_mks'].keys():
-            data['floating_mks'].pop(str(data['simobjects'][selection.Name][0]), None)
+        data['floating_mks'].pop(str(sim_object.mk), None)
         # Remove motion properties if it is changed to fluid
-        if data['simobjects'][selection.Name][0] in data['motion_mks'].keys():
-            data['motion_mks'].pop(data['simobjects'][selection.Name][0], None)
+        data['motion_mks'].pop(sim_object.mk, None)
         floatstate_prop.setEnabled(False)
         initials_prop.setEnabled(True)
         mkgroup_label.setText("&nbsp;&nbsp;&nbsp;" + __("MKFluid") + " <a href='http://design.sphysics.org/wiki/doku.php?id=concepts'>?</a>")
 
-    data['simobjects'][selection.Name][1] = objtype_prop.itemText(index)
+    sim_object.type = new_type
     on_tree_item_selection_change()
 
 
 def fillmode_change(index):
     """ Defines what happens when fill mode is changed """
-    selection = FreeCADGui.Selection.getSelection()[0]
-    selectiongui = FreeCADGui.getDocument("DSPH_Case").getObject(selection.Name)
-    data['simobjects'][selection.Name][2] = fillmode_prop.itemText(index)
-
-    if fillmode_prop.itemText(index).lower() == "full":
-        if objtype_prop.itemText(objtype_prop.currentIndex()).lower() == "fluid":
-            try:
-                selectiongui.Transparency = 30
-            except AttributeError:
-                # Cannot change transparency. Just ignore
-                pass
-        elif objtype_prop.itemText(objtype_prop.currentIndex()).lower() == "bound":
-            try:
-                selectiongui.Transparency = 0
-            except AttributeError:
-                # Cannot change transparency. Just ignore
-                pass
-    elif fillmode_prop.itemText(index).lower() == "solid":
-        if objtype_prop.itemText(objtype_prop.currentIndex()).lower() == "fluid":
-            try:
-                selectiongui.Transparency = 30
-            except AttributeError:
-                # Cannot change transparency (fillbox?). Just ignore
-                pass
-        elif objtype_prop.itemText(objtype_prop.currentIndex()).lower() == "bound":
-            try:
-                selectiongui.Transparency = 0
-            except AttributeError:
-                # Cannot change transparency (fillbox?). Just ignore
-                pass
-    elif fillmode_prop.itemText(index).lower() == "face":
-        try:
-            selectiongui.Transparency = 80
-        except AttributeError:
-            # Cannot change transparency. Just ignore
-            pass
-    elif fillmode_prop.itemText(index).lower() == "wire":
+    name = FreeCADGui.Selection.getSelection()[0].Name
+    selectiongui = FreeCADGui.getDocument("DSPH_Case").getObject(name)
+    fill_mode = fillmode_prop.itemText(index)
+    data['simobjects'][name].fill = fill_mode
+    fill_mode = fill_mode.lower()
+    object_type = objtype_prop.itemText(objtype_prop.currentIndex()).lower()
+
+    transparency = FILLMODE_TRANSPARENCY.get((fill_mode, object_type))
+    if transparency is not None:
         try:
-            selectiongui.Transparency = 85
+            selectiongui.Transparency = transparency
         except AttributeError:
-            # Cannot change transparency. Just ignore
+            # Cannot change transparency (fillbox?). Just ignore
             pass
 
 
-def floatstate_change():
-    """ Defines a window with floating properties. """
+def build_floatstate_window():
+    """ Builds the window with floating properties.
+    Returns the dialog and a function that loads the properties of an mk in it. """
     floatings_window = QtGui.QDialog()
     floatings_window.setWindowTitle(__("Floating configuration"))
     ok_button = QtGui.QPushButton(__("Ok"))
     cancel_button = QtGui.QPushButton(__("Cancel"))
-    target_mk = int(data['simobjects'][FreeCADGui.Selection.getSelection()[0].Name][0])
+    # MK being edited. Set each time the window is shown
+    target = {'mk': -1, 'key': "-1"}
+
+    def xyz_values(auto_checkbox, input_x, input_y, input_z):
+        """ Returns the [x, y, z] floats typed in the inputs, or a blank list() for auto. """
+        if auto_checkbox.isChecked():
+            return list()
+        return map(float, (input_x.text(), input_y.text(), input_z.text()))
 
     def on_ok():
-        guiutils.info_dialog(__("This will apply the floating properties to all objects with mkbound = ") + str(target_mk))
+        guiutils.info_dialog(__("This will apply the floating properties to all objects with mkbound = ") + target['key'])
         if is_floating_selector.currentIndex() == 1:
             # Floating false
-            if str(target_mk) in data['floating_mks'].keys():
-                data['floating_mks'].pop(str(target_mk), None)
+            data['floating_mks'].pop(target['key'], None)
         else:
             # Floating true
-            # Structure: 'mk': [massrhop, center, inertia, velini, omegaini]
             # Structure: 'mk': FloatProperty
-            fp = FloatProperty()  # FloatProperty to be inserted
-            fp.mk = target_mk
-            fp.mass_density_type = floating_props_massrhop_selector.currentIndex()
-            fp.mass_density_value = float(floating_props_massrhop_input.text())
-
-            if floating_center_auto.isChecked():
-                fp.gravity_center = list()
-            else:
-                fp.gravity_center = [float(floating_center_input_x.text()), float(floating_center_input_y.text()), float(floating_center_input_z.text())]
-
-            if floating_center_auto.isChecked():
-                fp.gravity_center = list()
-            else:
-                fp.gravity_center = [float(floating_center_input_x.text()), float(floating_center_input_y.text()), float(floating_center_input_z.text())]
-
-            if floating_inertia_auto.isChecked():
-                fp.inertia = list()
-            else:
-                fp.inertia = [float(floating_inertia_input_x.text()), float(floating_inertia_input_y.text()), float(floating_inertia_input_z.text())]
-
-            if floating_velini_auto.isChecked():
-                fp.initial_linear_velocity = list()
-            else:
-                fp.initial_linear_velocity = [
-                    float(floating_velini_input_x.text()),
-                    float(floating_velini_input_y.text()),
-                    float(floating_velini_input_z.text())
-                ]
-
-            if floating_omegaini_auto.isChecked():
-                fp.initial_angular_velocity = list()
-            else:
-                fp.initial_angular_velocity = [
-                    float(floating_omegaini_input_x.text()),
-                    float(floating_omegaini_input_y.text()),
-                    float(floating_omegaini_input_z.text())
-                ]
-
-            data['floating_mks'][str(target_mk)] = fp
+            data['floating_mks'][target['key']] = FloatProperty(
+                mk=target['mk'],
+                mass_density_type=floating_props_massrhop_selector.currentIndex(),
+                mass_density_value=float(floating_props_massrhop_input.text()),
+                gravity_center=xyz_values(floating_center_auto, floating_center_input_x, floating_center_input_y, floating_center_input_z),
+                inertia=xyz_values(floating_inertia_auto, floating_inertia_input_x, floating_inertia_input_y, floating_inertia_input_z),
+                initial_linear_velocity=xyz_values(floating_velini_auto, floating_velini_input_x, floating_velini_input_y, floating_velini_input_z),
+                initial_angular_velocity=xyz_values(floating_omegaini_auto, floating_omegaini_input_x, floating_omegaini_input_y, floating_omegaini_input_z))
 
         floatings_window.accept()
 
@@ -2892,46 +2978,6 @@ def floatstate_change():
         else:
             floating_props_massrhop_input.setText("0.0")
 
-    def on_gravity_auto():
-        if floating_center_auto.isChecked():
-            floating_center_input_x.setEnabled(False)
-            floating_center_input_y.setEnabled(False)
-            floating_center_input_z.setEnabled(False)
-        else:
-            floating_center_input_x.setEnabled(True)
-            floating_center_input_y.setEnabled(True)
-            floating_center_input_z.setEnabled(True)
-
-    def on_inertia_auto():
-        if floating_inertia_auto.isChecked():
-            floating_inertia_input_x.setEnabled(False)
-            floating_inertia_input_y.setEnabled(False)
-            floating_inertia_input_z.setEnabled(False)
-        else:
-            floating_inertia_input_x.setEnabled(True)
-            floating_inertia_input_y.setEnabled(True)
-            floating_inertia_input_z.setEnabled(True)
-
-    def on_velini_auto():
-        if floating_velini_auto.isChecked():
-            floating_velini_input_x.setEnabled(False)
-            floating_velini_input_y.setEnabled(False)
-            floating_velini_input_z.setEnabled(False)
-        else:
-            floating_velini_input_x.setEnabled(True)
-            floating_velini_input_y.setEnabled(True)
-            floating_velini_input_z.setEnabled(True)
-
-    def on_omegaini_auto():
-        if floating_omegaini_auto.isChecked():
-            floating_omegaini_input_x.setEnabled(False)
-            floating_omegaini_input_y.setEnabled(False)
-            floating_omegaini_input_z.setEnabled(False)
-        else:
-            floating_omegaini_input_x.setEnabled(True)
-            floating_omegaini_input_y.setEnabled(True)
-            floating_omegaini_input_z.setEnabled(True)
-
     ok_button.clicked.connect(on_ok)
     cancel_button.clicked.connect(on_cancel)
 
@@ -2941,7 +2987,7 @@ def floatstate_change():
     is_floating_selector = QtGui.QComboBox()
     is_floating_selector.insertItems(0, ["True", "False"])
     is_floating_selector.currentIndexChanged.connect(on_floating_change)
-    is_floating_targetlabel = QtGui.QLabel(__("Target MKBound: ") + str(target_mk))
+    is_floating_targetlabel = QtGui.QLabel()
     is_floating_layout.addWidget(is_floating_label)
     is_floating_layout.addWidget(is_floating_selector)
     is_floating_layout.addStretch(1)
@@ -2960,85 +3006,37 @@ def floatstate_change():
     floating_props_massrhop_layout.addWidget(floating_props_massrhop_selector)
     floating_props_massrhop_layout.addWidget(floating_props_massrhop_input)
 
-    floating_center_layout = QtGui.QHBoxLayout()
-    floating_center_label = QtGui.QLabel(__("Gravity center (m): "))
-    floating_center_label.setToolTip(__("Sets the mk group gravity center."))
-    floating_center_label_x = QtGui.QLabel("X")
-    floating_center_input_x = QtGui.QLineEdit()
-    floating_center_label_y = QtGui.QLabel("Y")
-    floating_center_input_y = QtGui.QLineEdit()
-    floating_center_label_z = QtGui.QLabel("Z")
-    floating_center_input_z = QtGui.QLineEdit()
-    floating_center_auto = QtGui.QCheckBox("Auto ")
-    floating_center_auto.toggled.connect(on_gravity_auto)
-    floating_center_layout.addWidget(floating_center_label)
-    floating_center_layout.addWidget(floating_center_label_x)
-    floating_center_layout.addWidget(floating_center_input_x)
-    floating_center_layout.addWidget(floating_center_label_y)
-    floating_center_layout.addWidget(floating_center_input_y)
-    floating_center_layout.addWidget(floating_center_label_z)
-    floating_center_layout.addWidget(floating_center_input_z)
-    floating_center_layout.addWidget(floating_center_auto)
-
-    floating_inertia_layout = QtGui.QHBoxLayout()
-    floating_inertia_label = QtGui.QLabel(__("Inertia (kg*m<sup>2</sup>): "))
-    floating_inertia_label.setToolTip(__("Sets the MK group inertia."))
-    floating_inertia_label_x = QtGui.QLabel("X")
-    floating_inertia_input_x = QtGui.QLineEdit()
-    floating_inertia_label_y = QtGui.QLabel("Y")
-    floating_inertia_input_y = QtGui.QLineEdit()
-    floating_inertia_label_z = QtGui.QLabel("Z")
-    floating_inertia_input_z = QtGui.QLineEdit()
-    floating_inertia_auto = QtGui.QCheckBox("Auto ")
-    floating_inertia_auto.toggled.connect(on_inertia_auto)
-    floating_inertia_layout.addWidget(floating_inertia_label)
-    floating_inertia_layout.addWidget(floating_inertia_label_x)
-    floating_inertia_layout.addWidget(floating_inertia_input_x)
-    floating_inertia_layout.addWidget(floating_inertia_label_y)
-    floating_inertia_layout.addWidget(floating_inertia_input_y)
-    floating_inertia_layout.addWidget(floating_inertia_label_z)
-    floating_inertia_layout.addWidget(floating_inertia_input_z)
-    floating_inertia_layout.addWidget(floating_inertia_auto)
-
-    floating_velini_layout = QtGui.QHBoxLayout()
-    floating_velini_label = QtGui.QLabel(__("Initial linear velocity: "))
-    floating_velini_label.setToolTip(__("Sets the MK group initial linear velocity"))
-    floating_velini_label_x = QtGui.QLabel("X")
-    floating_velini_input_x = QtGui.QLineEdit()
-    floating_velini_label_y = QtGui.QLabel("Y")
-    floating_velini_input_y = QtGui.QLineEdit()
-    floating_velini_label_z = QtGui.QLabel("Z")
-    floating_velini_input_z = QtGui.QLineEdit()
-    floating_velini_auto = QtGui.QCheckBox("Auto ")
-    floating_velini_auto.toggled.connect(on_velini_auto)
-    floating_velini_layout.addWidget(floating_velini_label)
-    floating_velini_layout.addWidget(floating_velini_label_x)
-    floating_velini_layout.addWidget(floating_velini_input_x)
-    floating_velini_layout.addWidget(floating_velini_label_y)
-    floating_velini_layout.addWidget(floating_velini_input_y)
-    floating_velini_layout.addWidget(floating_velini_label_z)
-    floating_velini_layout.addWidget(floating_velini_input_z)
-    floating_velini_layout.addWidget(floating_velini_auto)
-
-    floating_omegaini_layout = QtGui.QHBoxLayout()
-    floating_omegaini_label = QtGui.QLabel(__("Initial angular velocity: "))
-    floating_omegaini_label.setToolTip(__("Sets the MK group initial angular velocity"))
-    floating_omegaini_label_x = QtGui.QLabel("X")
-    floating_omegaini_input_x = QtGui.QLineEdit()
-    floating_omegaini_label_y = QtGui.QLabel("Y")
-    floating_omegaini_input_y = QtGui.QLineEdit()
-    floating_omegaini_label_z = QtGui.QLabel("Z")
-    floating_omegaini_input_z = QtGui.QLineEdit()
-    floating_omegaini_auto = QtGui.QCheckBox("Auto ")
-    floating_omegaini_auto.toggled.connect(on_omegaini_auto)
-    floating_omegaini_layout.addWidget(floating_omegaini_label)
-    floating_omegaini_layout.addWidget(floating_omegaini_label_x)
-    floating_omegaini_layout.addWidget(floating_omegaini_input_x)
-    floating_omegaini_layout.addWidget(floating_omegaini_label_y)
-    floating_omegaini_layout.addWidget(floating_omegaini_input_y)
-    floating_omegaini_layout.addWidget(floating_omegaini_label_z)
-    floating_omegaini_layout.addWidget(floating_omegaini_input_z)
-    floating_omegaini_layout.addWidget(floating_omegaini_auto)
+    def make_xyz_row(title, tooltip):
+        """ Builds a 'title X [] Y [] Z [] Auto' input row. Checking auto disables the inputs.
+        Returns the layout, the three inputs and the auto checkbox. """
+        row_layout = QtGui.QHBoxLayout()
+        row_label = QtGui.QLabel(title)
+        row_label.setToolTip(tooltip)
+        row_layout.addWidget(row_label)
+        inputs = list()
+        for axis in ("X", "Y", "Z"):
+            axis_input = QtGui.QLineEdit()
+            row_layout.addWidget(QtGui.QLabel(axis))
+            row_layout.addWidget(axis_input)
+            inputs.append(axis_input)
+        auto_checkbox = QtGui.QCheckBox("Auto ")
+
+        def on_auto(checked):
+            for axis_input in inputs:
+                axis_input.setEnabled(not checked)
+
+        auto_checkbox.toggled.connect(on_auto)
+        row_layout.addWidget(auto_checkbox)
+        return row_layout, inputs[0], inputs[1], inputs[2], auto_checkbox
+
+    floating_center_layout, floating_center_input_x, floating_center_input_y, floating_center_input_z, floating_center_auto = make_xyz_row(
+        __("Gravity center (m): "), __("Sets the mk group gravity center."))
+    floating_inertia_layout, floating_inertia_input_x, floating_inertia_input_y, floating_inertia_input_z, floating_inertia_auto = make_xyz_row(
+        __("Inertia (kg*m<sup>2</sup>): "), __("Sets the MK group inertia."))
+    floating_velini_layout, floating_velini_input_x, floating_velini_input_y, floating_velini_input_z, floating_velini_auto = make_xyz_row(
+        __("Initial linear velocity: "), __("Sets the MK group initial linear velocity"))
+    floating_omegaini_layout, floating_omegaini_input_x, floating_omegaini_input_y, floating_omegaini_input_z, floating_omegaini_auto = make_xyz_row(
+        __("Initial angular velocity: "), __("Sets the MK group initial angular velocity"))
 
     floating_props_layout.addLayout(floating_props_massrhop_layout)
     floating_props_layout.addLayout(floating_center_layout)
@@ -3060,103 +3058,123 @@ def floatstate_change():
 
     floatings_window.setLayout(floatings_window_layout)
 
-    if str(target_mk) in data['floating_mks'].keys():
-        is_floating_selector.setCurrentIndex(0)
-        on_floating_change(0)
-        floating_props_group.setEnabled(True)
-        floating_props_massrhop_selector.setCurrentIndex(data['floating_mks'][str(target_mk)].mass_density_type)
-        floating_props_massrhop_input.setText(str(data['floating_mks'][str(target_mk)].mass_density_value))
-        if len(data['floating_mks'][str(target_mk)].gravity_center) == 0:
+    def load_mk(target_mk):
+        """ Fills the window with the floating properties of the mk passed. """
+        target['mk'] = target_mk
+        target['key'] = str(target_mk)
+        is_floating_targetlabel.setText(__("Target MKBound: ") + target['key'])
+        fp = data['floating_mks'].get(target['key'])
+        # The selector signal is held back so its slot runs once, even if the index doesn't change
+        is_floating_selector.blockSignals(True)
+        if fp is not None:
+            is_floating_selector.setCurrentIndex(0)
+            is_floating_selector.blockSignals(False)
+            on_floating_change(0)
+            floating_props_group.setEnabled(True)
+            floating_props_massrhop_selector.setCurrentIndex(fp.mass_density_type)
+            floating_props_massrhop_input.setText(str(fp.mass_density_value))
+            if len(fp.gravity_center) == 0:
+                floating_center_input_x.setText("0")
+                floating_center_input_y.setText("0")
+                floating_center_input_z.setText("0")
+            else:
+                floating_center_input_x.setText(str(fp.gravity_center[0]))
+                floating_center_input_y.setText(str(fp.gravity_center[1]))
+                floating_center_input_z.setText(str(fp.gravity_center[2]))
+
+            if len(fp.inertia) == 0:
+                floating_inertia_input_x.setText("0")
+                floating_inertia_input_y.setText("0")
+                floating_inertia_input_z.setText("0")
+            else:
+                floating_inertia_input_x.setText(str(fp.inertia[0]))
+                floating_inertia_input_y.setText(str(fp.inertia[1]))
+                floating_inertia_input_z.setText(str(fp.inertia[2]))
+
+            if len(fp.initial_linear_velocity) == 0:
+                floating_velini_input_x.setText("0")
+                floating_velini_input_y.setText("0")
+                floating_velini_input_z.setText("0")
+            else:
+                floating_velini_input_x.setText(str(fp.initial_linear_velocity[0]))
+                floating_velini_input_y.setText(str(fp.initial_linear_velocity[1]))
+                floating_velini_input_z.setText(str(fp.initial_linear_velocity[2]))
+
+            if len(fp.initial_angular_velocity) == 0:
+                floating_omegaini_input_x.setText("0")
+                floating_omegaini_input_y.setText("0")
+                floating_omegaini_input_z.setText("0")
+            else:
+                floating_omegaini_input_x.setText(str(fp.initial_angular_velocity[0]))
+                floating_omegaini_input_y.setText(str(fp.initial_angular_velocity[1]))
+                floating_omegaini_input_z.setText(str(fp.initial_angular_velocity[2]))
+
+            floating_center_auto.setCheckState(QtCore.Qt.Checked if len(fp.gravity_center) == 0 else QtCore.Qt.Unchecked)
+            floating_inertia_auto.setCheckState(QtCore.Qt.Checked if len(fp.inertia) == 0 else QtCore.Qt.Unchecked)
+            floating_velini_auto.setCheckState(QtCore.Qt.Checked if len(fp.initial_linear_velocity) == 0 else QtCore.Qt.Unchecked)
+            floating_omegaini_auto.setCheckState(
+                QtCore.Qt.Checked if len(fp.initial_angular_velocity) == 0 else QtCore.Qt.Unchecked)
+        else:
+            is_floating_selector.setCurrentIndex(1)
+            is_floating_selector.blockSignals(False)
+            on_floating_change(1)
+            floating_props_group.setEnabled(False)
+            floating_props_massrhop_selector.setCurrentIndex(1)
+            floating_props_massrhop_input.setText("1000")
             floating_center_input_x.setText("0")
             floating_center_input_y.setText("0")
             floating_center_input_z.setText("0")
-        else:
-            floating_center_input_x.setText(str(data['floating_mks'][str(target_mk)].gravity_center[0]))
-            floating_center_input_y.setText(str(data['floating_mks'][str(target_mk)].gravity_center[1]))
-            floating_center_input_z.setText(str(data['floating_mks'][str(target_mk)].gravity_center[2]))
-
-        if len(data['floating_mks'][str(target_mk)].inertia) == 0:
             floating_inertia_input_x.setText("0")
             floating_inertia_input_y.setText("0")
             floating_inertia_input_z.setText("0")
-        else:
-            floating_inertia_input_x.setText(str(data['floating_mks'][str(target_mk)].inertia[0]))
-            floating_inertia_input_y.setText(str(data['floating_mks'][str(target_mk)].inertia[1]))
-            floating_inertia_input_z.setText(str(data['floating_mks'][str(target_mk)].inertia[2]))
-
-        if len(data['floating_mks'][str(target_mk)].initial_linear_velocity) == 0:
             floating_velini_input_x.setText("0")
             floating_velini_input_y.setText("0")
             floating_velini_input_z.setText("0")
-        else:
-            floating_velini_input_x.setText(str(data['floating_mks'][str(target_mk)].initial_linear_velocity[0]))
-            floating_velini_input_y.setText(str(data['floating_mks'][str(target_mk)].initial_linear_velocity[1]))
-            floating_velini_input_z.setText(str(data['floating_mks'][str(target_mk)].initial_linear_velocity[2]))
-
-        if len(data['floating_mks'][str(target_mk)].initial_angular_velocity) == 0:
             floating_omegaini_input_x.setText("0")
             floating_omegaini_input_y.setText("0")
             floating_omegaini_input_z.setText("0")
-        else:
-            floating_omegaini_input_x.setText(str(data['floating_mks'][str(target_mk)].initial_angular_velocity[0]))
-            floating_omegaini_input_y.setText(str(data['floating_mks'][str(target_mk)].initial_angular_velocity[1]))
-            floating_omegaini_input_z.setText(str(data['floating_mks'][str(target_mk)].initial_angular_velocity[2]))
-
-        floating_center_auto.setCheckState(QtCore.Qt.Checked if len(data['floating_mks'][str(target_mk)].gravity_center) == 0 else QtCore.Qt.Unchecked)
-        floating_inertia_auto.setCheckState(QtCore.Qt.Checked if len(data['floating_mks'][str(target_mk)].inertia) == 0 else QtCore.Qt.Unchecked)
-        floating_velini_auto.setCheckState(QtCore.Qt.Checked if len(data['floating_mks'][str(target_mk)].initial_linear_velocity) == 0 else QtCore.Qt.Unchecked)
-        floating_omegaini_auto.setCheckState(
-            QtCore.Qt.Checked if len(data['floating_mks'][str(target_mk)].initial_angular_velocity) == 0 else QtCore.Qt.Unchecked)
-    else:
-        is_floating_selector.setCurrentIndex(1)
-        on_floating_change(1)
-        floating_props_group.setEnabled(False)
-        is_floating_selector.setCurrentIndex(1)
-        floating_props_massrhop_selector.setCurrentIndex(1)
-        floating_props_massrhop_input.setText("1000")
-        floating_center_input_x.setText("0")
-        floating_center_input_y.setText("0")
-        floating_center_input_z.setText("0")
-        floating_inertia_input_x.setText("0")
-        floating_inertia_input_y.setText("0")
-        floating_inertia_input_z.setText("0")
-        floating_velini_input_x.setText("0")
-        floating_velini_input_y.setText("0")
-        floating_velini_input_z.setText("0")
-        floating_omegaini_input_x.setText("0")
-        floating_omegaini_input_y.setText("0")
-        floating_omegaini_input_z.setText("0")
-
-        floating_center_auto.setCheckState(QtCore.Qt.Checked)
-        floating_inertia_auto.setCheckState(QtCore.Qt.Checked)
-        floating_velini_auto.setCheckState(QtCore.Qt.Checked)
-        floating_omegaini_auto.setCheckState(QtCore.Qt.Checked)
 
+            floating_center_auto.setCheckState(QtCore.Qt.Checked)
+            floating_inertia_auto.setCheckState(QtCore.Qt.Checked)
+            floating_velini_auto.setCheckState(QtCore.Qt.Checked)
+            floating_omegaini_auto.setCheckState(QtCore.Qt.Checked)
+
+    return floatings_window, load_mk
+
+
+def floatstate_change():
+    """ Shows the window with floating properties for the mk of the selected object.
+    The window is built on first use and reused afterwards. """
+    if temp_data.get('floatstate_window') is None:
+        temp_data['floatstate_window'] = build_floatstate_window()
+    floatings_window, load_mk = temp_data['floatstate_window']
+    load_mk(int(data['simobjects'][FreeCADGui.Selection.getSelection()[0].Name].mk))
     floatings_window.exec_()
 
 
-def initials_change():
-    """ Defines a window with initials properties. """
+def build_initials_window():
+    """ Builds the window with initials properties.
+    Returns the dialog and a function that loads the properties of an mk in it. """
     initials_window = QtGui.QDialog()
     initials_window.setWindowTitle(__("Initials configuration"))
     ok_button = QtGui.QPushButton(__("Ok"))
     cancel_button = QtGui.QPushButton(__("Cancel"))
-    target_mk = int(data['simobjects'][FreeCADGui.Selection.getSelection()[0].Name][0])
+    # MK being edited. Set each time the window is shown
+    target = {'mk': -1, 'key': "-1"}
 
     # Ok button handler
     def on_ok():
-        guiutils.info_dialog(__("This will apply the initials properties to all objects with mkfluid = ") + str(target_mk))
+        guiutils.info_dialog(__("This will apply the initials properties to all objects with mkfluid = ") + target['key'])
         if has_initials_selector.currentIndex() == 1:
             # Initials false
-            if str(target_mk) in data['initials_mks'].keys():
-                data['initials_mks'].pop(str(target_mk), None)
+            data['initials_mks'].pop(target['key'], None)
         else:
             # Initials true
             # Structure: InitialsProperty Object
-            data['initials_mks'][str(target_mk)] = InitialsProperty(
-                mk=target_mk, force=[float(initials_vector_input_x.text()),
-                                     float(initials_vector_input_y.text()),
-                                     float(initials_vector_input_z.text())])
+            data['initials_mks'][target['key']] = InitialsProperty(
+                mk=target['mk'], force=[float(initials_vector_input_x.text()),
+                                        float(initials_vector_input_y.text()),
+                                        float(initials_vector_input_z.text())])
         initials_window.accept()
 
     # Cancel button handler
@@ -3179,7 +3197,7 @@ def initials_change():
     has_initials_selector = QtGui.QComboBox()
     has_initials_selector.insertItems(0, ['True', 'False'])
     has_initials_selector.currentIndexChanged.connect(on_initials_change)
-    has_initials_targetlabel = QtGui.QLabel(__("Target MKFluid: ") + str(target_mk))
+    has_initials_targetlabel = QtGui.QLabel()
     has_initials_layout.addWidget(has_initials_label)
     has_initials_layout.addWidget(has_initials_selector)
     has_initials_layout.addStretch(1)
@@ -3221,22 +3239,41 @@ def initials_change():
 
     initials_window.setLayout(initials_window_layout)
 
-    if str(target_mk) in data['initials_mks'].keys():
-        has_initials_selector.setCurrentIndex(0)
-        on_initials_change(0)
-        initials_props_group.setEnabled(True)
-        initials_vector_input_x.setText(str(data['initials_mks'][str(target_mk)].force[0]))
-        initials_vector_input_y.setText(str(data['initials_mks'][str(target_mk)].force[1]))
-        initials_vector_input_z.setText(str(data['initials_mks'][str(target_mk)].force[2]))
-    else:
-        has_initials_selector.setCurrentIndex(1)
-        on_initials_change(1)
-        initials_props_group.setEnabled(False)
-        has_initials_selector.setCurrentIndex(1)
-        initials_vector_input_x.setText("0")
-        initials_vector_input_y.setText("0")
-        initials_vector_input_z.setText("0")
+    def load_mk(target_mk):
+        """ Fills the window with the initials properties of the mk passed. """
+        target['mk'] = target_mk
+        target['key'] = str(target_mk)
+        has_initials_targetlabel.setText(__("Target MKFluid: ") + target['key'])
+        initials_property = data['initials_mks'].get(target['key'])
+        # The selector signal is held back so its slot runs once, even if the index doesn't change
+        has_initials_selector.blockSignals(True)
+        if initials_property is not None:
+            has_initials_selector.setCurrentIndex(0)
+            has_initials_selector.blockSignals(False)
+            on_initials_change(0)
+            initials_props_group.setEnabled(True)
+            initials_vector_input_x.setText(str(initials_property.force[0]))
+            initials_vector_input_y.setText(str(initials_property.force[1]))
+            initials_vector_input_z.setText(str(initials_property.force[2]))
+        else:
+            has_initials_selector.setCurrentIndex(1)
+            has_initials_selector.blockSignals(False)
+            on_initials_change(1)
+            initials_props_group.setEnabled(False)
+            initials_vector_input_x.setText("0")
+            initials_vector_input_y.setText("0")
+            initials_vector_input_z.setText("0")
 
+    return initials_window, load_mk
+
+
+def initials_change():
+    """ Shows the window with initials properties for the mk of the selected object.
+    The window is built on first use and reused afterwards. """
+    if temp_data.get('initials_window') is None:
+        temp_data['initials_window'] = build_initials_window()
+    initials_window, load_mk = temp_data['initials_window']
+    load_mk(int(data['simobjects'][FreeCADGui.Selection.getSelection()[0].Name].mk))
     initials_window.exec_()
 
 
@@ -3249,7 +3286,7 @@ def motion_change():
     cancel_button = QtGui.QPushButton(__("Cancel"))
     notice_label = QtGui.QLabel("")
     notice_label.setStyleSheet("QLabel { color : red; }")
-    target_mk = int(data['simobjects'][FreeCADGui.Selection.getSelection()[0].Name][0])
+    target_mk = int(data['simobjects'][FreeCADGui.Selection.getSelection()[0].Name].mk)
     movements_selected = list(data["motion_mks"].get(target_mk, list()))
 
     def on_ok():
@@ -3723,15 +3760,8 @@ fillmode_prop.currentIndexChanged.connect(fillmode_change)
 floatstate_prop.clicked.connect(floatstate_change)
 initials_prop.clicked.connect(initials_change)
 motion_prop.clicked.connect(motion_change)
-object_property_table.setCellWidget(0, 1, objtype_prop)
-object_property_table.setCellWidget(1, 1, mkgroup_prop)
-object_property_table.setCellWidget(2, 1, fillmode_prop)
-object_property_table.setCellWidget(3, 1, floatstate_prop)
-object_property_table.setCellWidget(4, 1, initials_prop)
-object_property_table.setCellWidget(5, 1, motion_prop)
-
-# Dock the widget to the left side of screen
-fc_main_window.addDockWidget(QtCore.Qt.LeftDockWidgetArea, properties_widget)
+for property_row, property_widget in enumerate((objtype_prop, mkgroup_prop, fillmode_prop, floatstate_prop, initials_prop, motion_prop)):
+    object_property_table.setCellWidget(property_row, 1, property_widget)
 
 # By default all is hidden in the widget
 object_property_table.hide()
@@ -3745,28 +3775,27 @@ def add_object_to_sim(name=None):
     if name is None:
         selection = FreeCADGui.Selection.getSelection()
     else:
-        selection = list()
-        selection.append(FreeCAD.ActiveDocument.getObject(name))
-
-    for each in selection:
-        if each.Name == "Case_Limits" or "_internal_" in each.Name:
-            continue
-        if len(each.InList) > 0:
-            continue
-        if each.Name not in data['simobjects'].keys():
-            if "fillbox" in each.Name.lower():
-                mktoput = utils.get_first_mk_not_used("fluid", data)
-                if not mktoput:
-                    mktoput = 0
-                data['simobjects'][each.Name] = [mktoput, 'fluid', 'solid']
-                data['mkfluidused'].append(mktoput)
-            else:
-                mktoput = utils.get_first_mk_not_used("bound", data)
-                if not mktoput:
-                    mktoput = 0
-                data['simobjects'][each.Name] = [mktoput, 'bound', 'full']
-                data['mkboundused'].append(mktoput)
-            data['export_order'].append(each.Name)
+        selection = [FreeCAD.ActiveDocument.getObject(name)]
+
+    simobjects = data['simobjects']
+    export_order = data['export_order']
+    candidates = (each for each in selection
+                  if each is not None and each.Name not in simobjects and each.Name != "Case_Limits" and
+                  "_internal_" not in each.Name and not each.InList)
+    for each in candidates:
+        if utils.is_fillbox(each):
+            mktoput = utils.get_first_mk_not_used("fluid", data)
+            if not mktoput:
+                mktoput = 0
+            simobjects[each.Name] = SimObject(mktoput, 'fluid', 'solid')
+            data['mkfluidused'].add(mktoput)
+        else:
+            mktoput = utils.get_first_mk_not_used("bound", data)
+            if not mktoput:
+                mktoput = 0
+            simobjects[each.Name] = SimObject(mktoput, 'bound', 'full')
+            data['mkboundused'].add(mktoput)
+        export_order.append(each.Name)
     on_tree_item_selection_change()
 
 
@@ -3794,55 +3823,43 @@ for item in fc_main_window.findChildren(QtGui.QTreeWidget):
         trees.append(item)
 
 
-def on_up_objectorder(index):
-    new_order = list()
-
-    # order up
-    curr_elem = data['export_order'][index]
-    prev_elem = data['export_order'][index - 1]
-
-    data['export_order'].remove(curr_elem)
+def swap_objectorder_rows(first_row, second_row):
+    """ Swaps in the export order the objects shown in two rows of the object list.
+    Rows skip objects not listed, so they are mapped back to names before swapping. """
+    row_names = temp_data['objectlist_row_names']
+    export_order = data['export_order']
+    first = export_order.index(row_names[first_row])
+    second = export_order.index(row_names[second_row])
+    export_order[first], export_order[second] = export_order[second], export_order[first]
 
-    for element in data['export_order']:
-        if element == prev_elem:
-            new_order.append(curr_elem)
-        new_order.append(element)
 
-    data['export_order'] = new_order
+def on_up_objectorder(index):
+    # order up: swap with the previous element
+    swap_objectorder_rows(index - 1, index)
 
     on_tree_item_selection_change()
 
 
 def on_down_objectorder(index):
-    new_order = list()
-
-    # order down
-    curr_elem = data['export_order'][index]
-    next_elem = data['export_order'][index + 1]
-
-    data['export_order'].remove(curr_elem)
-
-    for element in data['export_order']:
-        new_order.append(element)
-        if element == next_elem:
-            new_order.append(curr_elem)
-
-    data['export_order'] = new_order
+    # order down: swap with the next element
+    swap_objectorder_rows(index, index + 1)
 
     on_tree_item_selection_change()
 
 
 def on_tree_item_selection_change():
     selection = FreeCADGui.Selection.getSelection()
-    object_names = list()
-    for each in FreeCAD.getDocument("DSPH_Case").Objects:
-        object_names.append(each.Name)
-
-    # Detect object deletion
-    for key in data['simobjects'].keys():
-        if key not in object_names:
+    document_objects = utils.get_dsph_document().Objects
+
+    # Detect object deletion. New objects are appended to the document, so the object count
+    # and the last object name only stay the same when nothing was created or deleted.
+    document_signature = (len(document_objects), document_objects[-1].Name if document_objects else None)
+    if document_signature != temp_data.get('document_signature'):
+        temp_data['document_signature'] = document_signature
+        object_names = set(each.Name for each in document_objects)
+        for key in [key for key in data['simobjects'] if key not in object_names]:
             data['simobjects'].pop(key, None)
-            data['export_order'].remove(key)
+        data['export_order'] = [key for key in data['export_order'] if key in object_names]
 
     addtodsph_button.setEnabled(True)
     if len(selection) > 0:
@@ -3855,13 +3872,21 @@ def on_tree_item_selection_change():
             pass
         else:
             # One object selected
-            if selection[0].Name == "Case_Limits" or "_internal_" in selection[0].Name:
+            selected_object = selection[0]
+            selected_name = selected_object.Name
+            selected_type = selected_object.TypeId
+            if selected_name == "Case_Limits" or "_internal_" in selected_name:
                 object_property_table.hide()
                 addtodsph_button.hide()
                 removefromdsph_button.hide()
                 properties_widget.setMinimumHeight(100)
                 properties_widget.setMaximumHeight(100)
-            elif selection[0].Name in data['simobjects'].keys():
+            elif selected_name in data['simobjects']:
+                sim_object = data['simobjects'][selected_name]
+                object_fill = sim_object.fill
+                is_supported = selected_type in temp_data['supported_types']
+                is_fillbox = utils.is_fillbox(selected_object)
+
                 # Show properties on table
                 object_property_table.show()
                 addtodsph_button.hide()
@@ -3872,30 +3897,29 @@ def on_tree_item_selection_change():
                 # MK config
                 mkgroup_prop.setRange(0, 240)
                 to_change = object_property_table.cellWidget(1, 1)
-                to_change.setValue(data['simobjects'][selection[0].Name][0])
+                to_change.setValue(sim_object.mk)
 
                 # type config
                 to_change = object_property_table.cellWidget(0, 1)
-                if selection[0].TypeId in temp_data['supported_types']:
+                if is_supported:
                     # Supported object
                     to_change.setEnabled(True)
-                    if data['simobjects'][selection[0].Name][1].lower() == "fluid":
+                    if sim_object.is_fluid:
                         to_change.setCurrentIndex(0)
                         mkgroup_prop.setRange(0, 10)
                         mkgroup_label.setText("&nbsp;&nbsp;&nbsp;" + __("MKFluid") + " <a href='http://design.sphysics.org/wiki/doku.php?id=concepts'>?</a>")
-                    elif data['simobjects'][selection[0].Name][1].lower() == "bound":
+                    elif sim_object.is_bound:
                         to_change.setCurrentIndex(1)
                         mkgroup_prop.setRange(0, 240)
                         mkgroup_label.setText("&nbsp;&nbsp;&nbsp;" + __("MKBound") + " <a href='http://design.sphysics.org/wiki/doku.php?id=concepts'>?</a>")
-                elif selection[0].TypeId in ["Mesh::Feature", "Part::Cut"] or (selection[0].TypeId == "App::DocumentObjectGroup" and
-                                                                               "fillbox" in selection[0].Name.lower()):
+                elif selected_type in ("Mesh::Feature", "Part::Cut") or is_fillbox:
                     # Is an object that will be exported to STL
                     to_change.setEnabled(True)
-                    if data['simobjects'][selection[0].Name][1].lower() == "fluid":
+                    if sim_object.is_fluid:
                         to_change.setCurrentIndex(0)
                         mkgroup_prop.setRange(0, 10)
                         mkgroup_label.setText("&nbsp;&nbsp;&nbsp;" + __("MKFluid") + " <a href='http://design.sphysics.org/wiki/doku.php?id=concepts'>?</a>")
-                    elif data['simobjects'][selection[0].Name][1].lower() == "bound":
+                    elif sim_object.is_bound:
                         to_change.setCurrentIndex(1)
                         mkgroup_prop.setRange(0, 240)
                         mkgroup_label.setText("&nbsp;&nbsp;&nbsp;" + __("MKBound") + " <a href='http://design.sphysics.org/wiki/doku.php?id=concepts'>?</a>")
@@ -3906,18 +3930,18 @@ def on_tree_item_selection_change():
 
                 # fill mode config
                 to_change = object_property_table.cellWidget(2, 1)
-                if selection[0].TypeId in temp_data['supported_types']:
+                if is_supported:
                     # Object is a supported type. Fill with its type and enable selector.
                     to_change.setEnabled(True)
-                    if data['simobjects'][selection[0].Name][2].lower() == "full":
+                    if object_fill == "full":
                         to_change.setCurrentIndex(0)
-                    elif data['simobjects'][selection[0].Name][2].lower() == "solid":
+                    elif object_fill == "solid":
                         to_change.setCurrentIndex(1)
-                    elif data['simobjects'][selection[0].Name][2].lower() == "face":
+                    elif object_fill == "face":
                         to_change.setCurrentIndex(2)
-                    elif data['simobjects'][selection[0].Name][2].lower() == "wire":
+                    elif object_fill == "wire":
                         to_change.setCurrentIndex(3)
-                elif selection[0].TypeId == 'App::DocumentObjectGroup':
+                elif selected_type == 'App::DocumentObjectGroup':
                     # Is a fillbox. Set fill mode to solid and disable
                     to_change.setCurrentIndex(1)
                     to_change.setEnabled(False)
@@ -3928,25 +3952,23 @@ def on_tree_item_selection_change():
 
                 # float state config
                 to_change = object_property_table.cellWidget(3, 1)
-                if selection[0].TypeId in temp_data['supported_types'] or (selection[0].TypeId == "App::DocumentObjectGroup" and
-                                                                           "fillbox" in selection[0].Name.lower()):
-                    if data['simobjects'][selection[0].Name][1].lower() == "fluid":
+                if is_supported or is_fillbox:
+                    if sim_object.is_fluid:
                         to_change.setEnabled(False)
                     else:
                         to_change.setEnabled(True)
 
                 # initials restrictions
                 to_change = object_property_table.cellWidget(4, 1)
-                if data['simobjects'][selection[0].Name][1].lower() == "fluid":
+                if sim_object.is_fluid:
                     to_change.setEnabled(True)
                 else:
                     to_change.setEnabled(False)
 
                 # motion restrictions
                 to_change = object_property_table.cellWidget(5, 1)
-                if selection[0].TypeId in temp_data['supported_types'] or "Mesh::Feature" in str(selection[0].TypeId) or \
-                        (selection[0].TypeId == "App::DocumentObjectGroup" and "fillbox" in selection[0].Name.lower()):
-                    if data['simobjects'][selection[0].Name][1].lower() == "fluid":
+                if is_supported or "Mesh::Feature" in str(selected_type) or is_fillbox:
+                    if sim_object.is_fluid:
                         to_change.setEnabled(False)
                     else:
                         to_change.setEnabled(True)
@@ -3954,7 +3976,7 @@ def on_tree_item_selection_change():
             else:
                 properties_widget.setMinimumHeight(100)
                 properties_widget.setMaximumHeight(100)
-                if selection[0].InList == list():
+                if selected_object.InList == list():
                     # Show button to add to simulation
                     addtodsph_button.setText(__("Add to DSPH Simulation"))
                     object_property_table.hide()
@@ -3972,100 +3994,141 @@ def on_tree_item_selection_change():
         removefromdsph_button.hide()
 
     # Update dsph objects list
-    objectlist_table.clear()
-    objectlist_table.setEnabled(True)
-    if len(data['export_order']) == 0:
-        data['export_order'] = data['simobjects'].keys()
-
-    # Substract one that represent case limits object
-    if "Case_Limits" in data['export_order']:
-        data['export_order'].remove("Case_Limits")
-
-    objectlist_table.setRowCount(len(data['export_order']))
-    current_row = 0
-    objects_with_parent = list()
-    for key in data['export_order']:
-        context_object = FreeCAD.getDocument("DSPH_Case").getObject(key)
-        if not context_object:
-            data['export_order'].remove(key)
-            continue
-        if context_object.InList != list():
-            objects_with_parent.append(context_object.Name)
-            continue
-        if context_object.Name == "Case_Limits":
-            continue
-        # objectlist_table.setCellWidget(current_row, 0, QtGui.QLabel("   " + context_object.Label))
-        target_widget = dsphwidgets.ObjectOrderWidget(
-            index=current_row,
-            object_mk=data['simobjects'][context_object.Name][0],
-            mktype=data['simobjects'][context_object.Name][1],
-            object_name=context_object.Label)
-
-        target_widget.up.connect(on_up_objectorder)
-        target_widget.down.connect(on_down_objectorder)
+    # Rows are rebuilt with painting and signals suspended, then repainted once
+    objectlist_table.setUpdatesEnabled(False)
+    objectlist_table.blockSignals(True)
+    try:
+        objectlist_table.clear()
+        objectlist_table.setEnabled(True)
+        if len(data['export_order']) == 0:
+            data['export_order'] = data['simobjects'].keys()
 
-        if current_row is 0:
-            target_widget.disable_up()
-        if (current_row + 1) is len(data['export_order']):
-            target_widget.disable_down()
+        # Substract one that represent case limits object
+        if "Case_Limits" in data['export_order']:
+            data['export_order'].remove("Case_Limits")
 
-        objectlist_table.setCellWidget(current_row, 0, target_widget)
+        objectlist_table.setRowCount(len(data['export_order']))
+        current_row = 0
+        objects_with_parent = list()
+        # Object name shown in each row, used to map the order buttons back to export_order
+        row_names = list()
+        temp_data['objectlist_row_names'] = row_names
+        for key in data['export_order']:
+            context_object = utils.get_dsph_document().getObject(key)
+            if not context_object:
+                continue
+            if context_object.InList != list():
+                objects_with_parent.append(context_object.Name)
+                continue
+            if context_object.Name == "Case_Limits":
+                continue
+            # objectlist_table.setCellWidget(current_row, 0, QtGui.QLabel("   " + context_object.Label))
+            target_widget = dsphwidgets.ObjectOrderWidget(
+                index=current_row,
+                object_mk=data['simobjects'][context_object.Name].mk,
+                mktype=data['simobjects'][context_object.Name].type,
+                object_name=context_object.Label,
+                up_disabled=current_row == 0,
+                down_disabled=current_row + 1 == len(data['export_order']))
+
+            target_widget.up.connect(on_up_objectorder)
+            target_widget.down.connect(on_down_objectorder)
+
+            objectlist_table.setCellWidget(current_row, 0, target_widget)
+            row_names.append(context_object.Name)
 
-        current_row += 1
+            current_row += 1
+        if current_row > 0:
+            # Skipped objects leave the last listed row short of the export order length
+            objectlist_table.cellWidget(current_row - 1, 0).disable_down()
+    finally:
+        objectlist_table.blockSignals(False)
+        objectlist_table.setUpdatesEnabled(True)
+        objectlist_table.viewport().update()
+    # Objects that are now part of a compound object are no longer simulated on their own
     for each in objects_with_parent:
-        try:
-            data['simobjects'].pop(each, None)
-        except ValueError:
-            # Not in list, probably because now is part of a compound object
-            pass
-        data['export_order'].remove(each)
+        data['simobjects'].pop(each, None)
+    if objects_with_parent:
+        objects_with_parent = set(objects_with_parent)
+        data['export_order'] = [key for key in data['export_order'] if key not in objects_with_parent]
+
 
+# Bursts of tree selection changes (keyboard navigation, drag selection) are collapsed
+# into a single refresh, fired 75 ms after the last change.
+tree_selection_timer = QtCore.QTimer(dsph_main_dock)
+tree_selection_timer.setSingleShot(True)
+tree_selection_timer.setInterval(75)
+tree_selection_timer.timeout.connect(on_tree_item_selection_change)
 
 for item in trees:
-    item.itemSelectionChanged.connect(on_tree_item_selection_change)
+    item.itemSelectionChanged.connect(tree_selection_timer.start)
+
+
+# Watch if no object is selected and prevent fillbox rotations.
+# Runs on the GUI thread from a timer, so FreeCAD objects and widgets are never touched from another thread.
+selection_monitor_timer = QtCore.QTimer(dsph_main_dock)
+selection_monitor_timer.setInterval(500)
 
 
-# Watch if no object is selected and prevent fillbox rotations
 def selection_monitor():
-    while True:
-        # ensure everything is fine when objects are not selected
-        if len(FreeCADGui.Selection.getSelection()) == 0:
-            object_property_table.hide()
-            addtodsph_button.hide()
-            removefromdsph_button.hide()
-        try:
-            # watch fillbox rotations and prevent them
-            for o in FreeCAD.getDocument("DSPH_Case").Objects:
-                if o.TypeId == "App::DocumentObjectGroup" and "fillbox" in o.Name.lower():
-                    for subelem in o.OutList:
-                        if subelem.Placement.Rotation.Angle != 0.0:
-                            subelem.Placement.Rotation.Angle = 0.0
-                            utils.error(__("Can't change rotation!"))
-                if "case_limits" in o.Name.lower():
-                    if o.Placement.Rotation.Angle != 0.0:
-                        o.Placement.Rotation.Angle = 0.0
-                        utils.error(__("Can't change rotation!"))
-                    if not data['3dmode'] and o.Width.Value != utils.WIDTH_2D:
-                        o.Width.Value = utils.WIDTH_2D
-                        utils.error(__("Can't change width if the case is in 2D Mode!"))
+    """ Hides the object properties when nothing is selected and reverts forbidden changes
+    (fillbox and case limits rotations, 2D width, case limits view properties). """
+    # ensure everything is fine when objects are not selected
+    if len(FreeCADGui.Selection.getSelection()) == 0:
+        object_property_table.hide()
+        addtodsph_button.hide()
+        removefromdsph_button.hide()
+    try:
+        dsph_document = utils.get_dsph_document()
+        # watch fillbox rotations and prevent them. Only groups are fetched, not every object in the case
+        for group in dsph_document.findObjects("App::DocumentObjectGroup"):
+            if not utils.is_fillbox(group):
+                continue
+            for subelem in group.OutList:
+                if subelem.Placement.Rotation.Angle != 0.0:
+                    subelem.Placement.Rotation.Angle = 0.0
+                    utils.error(__("Can't change rotation!"))
+
+        case_limits = dsph_document.getObject("Case_Limits")
+        if case_limits is not None:
+            if case_limits.Placement.Rotation.Angle != 0.0:
+                case_limits.Placement.Rotation.Angle = 0.0
+                utils.error(__("Can't change rotation!"))
+            if not data['3dmode'] and case_limits.Width.Value != utils.WIDTH_2D:
+                case_limits.Width.Value = utils.WIDTH_2D
+                utils.error(__("Can't change width if the case is in 2D Mode!"))
 
             # Prevent some view properties of Case Limits to be changed
-            if guiutils.get_fc_view_object("Case_Limits").DisplayMode != "Wireframe":
-                guiutils.get_fc_view_object("Case_Limits").DisplayMode = "Wireframe"
-            if guiutils.get_fc_view_object("Case_Limits").LineColor != (1.00, 0.00, 0.00):
-                guiutils.get_fc_view_object("Case_Limits").LineColor = (1.00, 0.00, 0.00)
-            if guiutils.get_fc_view_object("Case_Limits").Selectable:
-                guiutils.get_fc_view_object("Case_Limits").Selectable = False
-        except NameError:
-            # DSPH Case not opened, disable things
-            guiutils.widget_state_config(widget_state_elements, "no case")
-            time.sleep(2.0)
-            continue
-        time.sleep(0.5)
+            case_limits_view = guiutils.get_fc_view_object("Case_Limits")
+            if case_limits_view.DisplayMode != "Wireframe":
+                case_limits_view.DisplayMode = "Wireframe"
+            if case_limits_view.LineColor != (1.00, 0.00, 0.00):
+                case_limits_view.LineColor = (1.00, 0.00, 0.00)
+            if case_limits_view.Selectable:
+                case_limits_view.Selectable = False
+    except NameError:
+        # DSPH Case not opened, disable things and check less often
+        guiutils.widget_state_config(widget_state_elements, "no case")
+        selection_monitor_timer.setInterval(2000)
+        return
+    selection_monitor_timer.setInterval(500)
+
+
+selection_monitor_timer.timeout.connect(selection_monitor)
+
+
+def on_widgets_built():
+    """ Docks the DSPH widgets and starts monitoring the selection.
+    Called from the event loop, once the whole interface is created,
+    so FreeCAD lays out and paints both docks a single time. """
+    # DSPH main dock at right side of screen, properties dock at the left side
+    fc_main_window.addDockWidget(QtCore.Qt.RightDockWidgetArea, dsph_main_dock)
+    fc_main_window.addDockWidget(QtCore.Qt.LeftDockWidgetArea, properties_widget)
+
+    selection_monitor_timer.start()
 
+    FreeCADGui.activateWorkbench("PartWorkbench")
+    utils.log(__("Loading data is done."))
 
-monitor_thread = threading.Thread(target=selection_monitor)
-monitor_thread.start()
 
-FreeCADGui.activateWorkbench("PartWorkbench")
-utils.log(__("Loading data is done."))
+QtCore.QTimer.singleShot(0, on_widgets_built)
@@ -2319,6 +2319,9 @@ class ObjectOrderWidget(QtGui.QWidget):
     up = QtCore.Signal(int)  # Passes element index
     down = QtCore.Signal(int)  # Passes element index
 
+    # Bold font shared by the mk labels of every row, created on first use
+    mk_font = None
+
     def __init__(self, index=999, object_name="No name", object_mk=-1, mktype="bound",
                  up_disabled=False, down_disabled=False):
         super(ObjectOrderWidget, self).__init__()
@@ -2327,8 +2330,16 @@ class ObjectOrderWidget(QtGui.QWidget):
         self.object_name = object_name
         self.main_layout = QtGui.QHBoxLayout()
         self.main_layout.setContentsMargins(10, 0, 10, 0)
-        self.mk_label = QtGui.QLabel("<b>{}{}</b>".format(mktype[0].upper(), str(object_mk)))
+        if ObjectOrderWidget.mk_font is None:
+            ObjectOrderWidget.mk_font = QtGui.QFont()
+            ObjectOrderWidget.mk_font.setBold(True)
+        # Both labels are plain text: no rich text document per row, and the
+        # user defined object name is shown as typed
+        self.mk_label = QtGui.QLabel("{}{}".format(mktype[0].upper(), str(object_mk)))
+        self.mk_label.setTextFormat(QtCore.Qt.PlainText)
+        self.mk_label.setFont(ObjectOrderWidget.mk_font)
         self.name_label = QtGui.QLabel(str(object_name))
+        self.name_label.setTextFormat(QtCore.Qt.PlainText)
         self.up_button = QtGui.QPushButton(guiutils.get_icon("up_arrow.png"), None)
         self.up_button.clicked.connect(self.on_up)
         self.down_button = QtGui.QPushButton(guiutils.get_icon("down_arrow.png"), None)
@@ -9,12 +9,17 @@ operations in DesignSPHysics.
 
 import FreeCAD
 import FreeCADGui
-import pickle
 import sys
 import os
 import utils
 from sys import platform
 from PySide import QtGui, QtCore
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 """
 Copyright (C) 2016 - Andrés Vieira (anvieiravazquez@gmail.com)
 EPHYSLAB Environmental Physics Laboratory, Universidade de Vigo
@@ -35,6 +40,18 @@ You should have received a copy of the GNU General Public License
 along with DesignSPHysics.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+# Path to the DSPH_Images folder, resolved once
+IMAGES_PATH = os.path.dirname(os.path.abspath(__file__)) + "/../DSPH_Images/"
+
+# QIcons already loaded by get_icon, keyed by file name
+_icon_cache = dict()
+
+# Message box shared by warning_dialog, error_dialog and info_dialog
+_messagebox = None
+
+# DSPH main dock, cached by get_dsph_dock
+_dsph_dock = None
+
 
 def h_line_generator():
     to_ret = QtGui.QFrame()
@@ -50,37 +67,38 @@ def v_line_generator():
     return to_ret
 
 
+def _shared_messagebox(text, icon, detailed_text=None):
+    """ Returns the message box reused by the dialog helpers, set up with the text, icon and details passed.
+    A new one is only created the first time, or if the shared one is already on screen. """
+    global _messagebox
+    if _messagebox is None:
+        _messagebox = QtGui.QMessageBox()
+    elif _messagebox.isVisible():
+        return _build_messagebox(QtGui.QMessageBox(), text, icon, detailed_text)
+    return _build_messagebox(_messagebox, text, icon, detailed_text)
+
+
+def _build_messagebox(messagebox, text, icon, detailed_text):
+    messagebox.setText(text)
+    messagebox.setIcon(icon)
+    # An empty detailed text also removes the details button left by a previous message
+    messagebox.setDetailedText(str(detailed_text) if detailed_text is not None else "")
+    return messagebox
+
+
 def warning_dialog(warn_text, detailed_text=None):
     """Spawns a warning dialog with the text passed."""
-
-    warning_messagebox = QtGui.QMessageBox()
-    warning_messagebox.setText(warn_text)
-    warning_messagebox.setIcon(QtGui.QMessageBox.Warning)
-    if detailed_text is not None:
-        warning_messagebox.setDetailedText(str(detailed_text))
-    warning_messagebox.exec_()
+    _shared_messagebox(warn_text, QtGui.QMessageBox.Warning, detailed_text).exec_()
 
 
 def error_dialog(error_text, detailed_text=None):
     """Spawns an error dialog with the text passed."""
-
-    error_messagebox = QtGui.QMessageBox()
-    error_messagebox.setText(error_text)
-    error_messagebox.setIcon(QtGui.QMessageBox.Critical)
-    if detailed_text is not None:
-        error_messagebox.setDetailedText(str(detailed_text))
-    error_messagebox.exec_()
+    _shared_messagebox(error_text, QtGui.QMessageBox.Critical, detailed_text).exec_()
 
 
 def info_dialog(info_text, detailed_text=None):
     """Spawns an info dialog with the text passed."""
-
-    info_messagebox = QtGui.QMessageBox()
-    info_messagebox.setText(info_text)
-    info_messagebox.setIcon(QtGui.QMessageBox.Information)
-    if detailed_text is not None:
-        info_messagebox.setDetailedText(str(detailed_text))
-    info_messagebox.exec_()
+    _shared_messagebox(info_text, QtGui.QMessageBox.Information, detailed_text).exec_()
 
 
 def ok_cancel_dialog(title, text):
@@ -97,11 +115,14 @@ def ok_cancel_dialog(title, text):
 
 def get_icon(file_name):
     """ Returns a QIcon to use with DesignSPHysics.
-    Retrieves a file with filename (like image.png) from the DSPH_Images folder. """
-    file_to_load = os.path.dirname(
-        os.path.abspath(__file__)) + "/../DSPH_Images/{}".format(file_name)
+    Retrieves a file with filename (like image.png) from the DSPH_Images folder.
+    Icons are loaded once and reused on subsequent calls. """
+    if file_name in _icon_cache:
+        return _icon_cache[file_name]
+    file_to_load = IMAGES_PATH + file_name
     if os.path.isfile(file_to_load):
-        return QtGui.QIcon(file_to_load)
+        _icon_cache[file_name] = QtGui.QIcon(file_to_load)
+        return _icon_cache[file_name]
     else:
         raise IOError(
             "File {} not found in DSPH_Images folder".format(file_name))
@@ -1249,11 +1270,10 @@ def def_setup_window(data):
         setup_window.reject()
 
     def on_gencase_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select GenCase path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select GenCase path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed gencase
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1276,11 +1296,10 @@ def def_setup_window(data):
                 )
 
     def on_dualsphysics_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select DualSPHysics path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select DualSPHysics path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed dualsphysics
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1307,11 +1326,10 @@ def def_setup_window(data):
                 )
 
     def on_partvtk4_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select PartVTK4 path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select PartVTK4 path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed dualsphysics
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1334,11 +1352,10 @@ def def_setup_window(data):
                 )
 
     def on_computeforces_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select ComputeForces path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select ComputeForces path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed computeforces
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1361,11 +1378,10 @@ def def_setup_window(data):
                 )
 
     def on_floatinginfo_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select FloatingInfo path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select FloatingInfo path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed floatinginfo
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1388,11 +1404,10 @@ def def_setup_window(data):
                 )
 
     def on_measuretool_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select MeasureTool path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select MeasureTool path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed measuretool
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1415,11 +1430,10 @@ def def_setup_window(data):
                 )
 
     def on_isosurface_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select IsoSurface path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select IsoSurface path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed measuretool
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1442,11 +1456,10 @@ def def_setup_window(data):
                 )
 
     def on_boundaryvtk_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select BoundaryVTK path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select BoundaryVTK path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             # Verify if exe is indeed measuretool
             process = QtCore.QProcess(FreeCADGui.getMainWindow())
@@ -1469,11 +1482,10 @@ def def_setup_window(data):
                 )
 
     def on_paraview_browse():
-        filedialog = QtGui.QFileDialog()
         # noinspection PyArgumentList
-        file_name, _ = filedialog.getOpenFileName(setup_window,
-                                                  "Select ParaView path",
-                                                  QtCore.QDir.homePath())
+        file_name, _ = QtGui.QFileDialog.getOpenFileName(setup_window,
+                                                      "Select ParaView path",
+                                                      QtCore.QDir.homePath())
         if file_name != "":
             paraview_input.setText(file_name)
 
@@ -1520,142 +1532,207 @@ def def_setup_window(data):
     setup_window.exec_()
 
 
-def widget_state_config(widgets, config):
-    """ Takes an widget dictionary and a config string to
-        enable and disable certain widgets base on a case. """
-    if config == "no case":
-        widgets["casecontrols_bt_savedoc"].setEnabled(False)
-        widgets["constants_button"].setEnabled(False)
-        widgets["execparams_button"].setEnabled(False)
-        widgets["casecontrols_bt_addfillbox"].setEnabled(False)
-        widgets["casecontrols_bt_addstl"].setEnabled(False)
-        widgets["ex_button"].setEnabled(False)
-        widgets["ex_additional"].setEnabled(False)
-        widgets["ex_selector_combo"].setEnabled(False)
-        widgets['post_proc_partvtk_button'].setEnabled(False)
-        widgets['post_proc_computeforces_button'].setEnabled(False)
-        widgets['post_proc_floatinginfo_button'].setEnabled(False)
-        widgets['post_proc_measuretool_button'].setEnabled(False)
-        widgets['post_proc_isosurface_button'].setEnabled(False)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(False)
-        widgets["objectlist_table"].setEnabled(False)
-        widgets["dp_input"].setEnabled(False)
-        widgets["summary_bt"].setEnabled(False)
-        widgets["toggle3dbutton"].setEnabled(False)
-    elif config == "new case":
-        widgets["constants_button"].setEnabled(True)
-        widgets["execparams_button"].setEnabled(True)
-        widgets["casecontrols_bt_savedoc"].setEnabled(True)
-        widgets["dp_input"].setEnabled(True)
-        widgets["ex_selector_combo"].setEnabled(False)
-        widgets["ex_button"].setEnabled(False)
-        widgets["ex_additional"].setEnabled(False)
-        widgets['post_proc_partvtk_button'].setEnabled(False)
-        widgets['post_proc_computeforces_button'].setEnabled(False)
-        widgets['post_proc_floatinginfo_button'].setEnabled(False)
-        widgets['post_proc_measuretool_button'].setEnabled(False)
-        widgets['post_proc_isosurface_button'].setEnabled(False)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(False)
-        widgets["casecontrols_bt_addfillbox"].setEnabled(True)
-        widgets["casecontrols_bt_addstl"].setEnabled(True)
-        widgets["summary_bt"].setEnabled(True)
-        widgets["toggle3dbutton"].setEnabled(True)
-        widgets["properties_bt"].setEnabled(True)
-    elif config == "gencase done":
-        widgets["ex_selector_combo"].setEnabled(True)
-        widgets["ex_button"].setEnabled(True)
-        widgets["ex_additional"].setEnabled(True)
-    elif config == "gencase not done":
-        widgets["ex_selector_combo"].setEnabled(False)
-        widgets["ex_button"].setEnabled(False)
-        widgets["ex_additional"].setEnabled(False)
-    elif config == "load base":
-        widgets["constants_button"].setEnabled(True)
-        widgets["execparams_button"].setEnabled(True)
-        widgets["casecontrols_bt_savedoc"].setEnabled(True)
-        widgets["dp_input"].setEnabled(True)
-        widgets["casecontrols_bt_addfillbox"].setEnabled(True)
-        widgets["casecontrols_bt_addstl"].setEnabled(True)
-        widgets["summary_bt"].setEnabled(True)
-        widgets["toggle3dbutton"].setEnabled(True)
-        widgets["properties_bt"].setEnabled(True)
-    elif config == "simulation done":
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
-    elif config == "simulation not done":
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
-    elif config == "execs not correct":
-        widgets["ex_selector_combo"].setEnabled(False)
-        widgets["ex_button"].setEnabled(False)
-        widgets["ex_additional"].setEnabled(False)
-        widgets['post_proc_partvtk_button'].setEnabled(False)
-        widgets['post_proc_computeforces_button'].setEnabled(False)
-        widgets['post_proc_floatinginfo_button'].setEnabled(False)
-        widgets['post_proc_measuretool_button'].setEnabled(False)
-        widgets['post_proc_isosurface_button'].setEnabled(False)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(False)
-    elif config == "sim start":
-        widgets["ex_button"].setEnabled(False)
-        widgets["ex_additional"].setEnabled(False)
-        widgets["ex_selector_combo"].setEnabled(False)
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
-    elif config == "sim cancel":
-        widgets["ex_selector_combo"].setEnabled(True)
-        widgets["ex_button"].setEnabled(True)
-        widgets["ex_additional"].setEnabled(True)
+# Enabled state of the widgets registered in widget_state_elements, for every case state.
+WIDGET_STATES = {
+    "no case": {
+        "casecontrols_bt_savedoc": False,
+        "constants_button": False,
+        "execparams_button": False,
+        "casecontrols_bt_addfillbox": False,
+        "casecontrols_bt_addstl": False,
+        "ex_button": False,
+        "ex_additional": False,
+        "ex_selector_combo": False,
+        "post_proc_partvtk_button": False,
+        "post_proc_computeforces_button": False,
+        "post_proc_floatinginfo_button": False,
+        "post_proc_measuretool_button": False,
+        "post_proc_isosurface_button": False,
+        "post_proc_boundaryvtk_button": False,
+        "objectlist_table": False,
+        "dp_input": False,
+        "summary_bt": False,
+        "toggle3dbutton": False,
+    },
+    "new case": {
+        "constants_button": True,
+        "execparams_button": True,
+        "casecontrols_bt_savedoc": True,
+        "dp_input": True,
+        "ex_selector_combo": False,
+        "ex_button": False,
+        "ex_additional": False,
+        "post_proc_partvtk_button": False,
+        "post_proc_computeforces_button": False,
+        "post_proc_floatinginfo_button": False,
+        "post_proc_measuretool_button": False,
+        "post_proc_isosurface_button": False,
+        "post_proc_boundaryvtk_button": False,
+        "casecontrols_bt_addfillbox": True,
+        "casecontrols_bt_addstl": True,
+        "summary_bt": True,
+        "toggle3dbutton": True,
+        "properties_bt": True,
+    },
+    "gencase start": {
+        "casecontrols_bt_newdoc": False,
+        "casecontrols_bt_savedoc": False,
+        "casecontrols_bt_loaddoc": False,
+        "casecontrols_bt_importxml": False,
+        "ex_selector_combo": False,
+        "ex_button": False,
+        "ex_additional": False,
+    },
+    "gencase finished": {
+        "casecontrols_bt_newdoc": True,
+        "casecontrols_bt_savedoc": True,
+        "casecontrols_bt_loaddoc": True,
+        "casecontrols_bt_importxml": True,
+    },
+    "gencase done": {
+        "ex_selector_combo": True,
+        "ex_button": True,
+        "ex_additional": True,
+    },
+    "gencase not done": {
+        "ex_selector_combo": False,
+        "ex_button": False,
+        "ex_additional": False,
+    },
+    "load base": {
+        "constants_button": True,
+        "execparams_button": True,
+        "casecontrols_bt_savedoc": True,
+        "dp_input": True,
+        "casecontrols_bt_addfillbox": True,
+        "casecontrols_bt_addstl": True,
+        "summary_bt": True,
+        "toggle3dbutton": True,
+        "properties_bt": True,
+    },
+    "simulation done": {
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+    "simulation not done": {
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+    "execs not correct": {
+        "ex_selector_combo": False,
+        "ex_button": False,
+        "ex_additional": False,
+        "post_proc_partvtk_button": False,
+        "post_proc_computeforces_button": False,
+        "post_proc_floatinginfo_button": False,
+        "post_proc_measuretool_button": False,
+        "post_proc_isosurface_button": False,
+        "post_proc_boundaryvtk_button": False,
+    },
+    "sim start": {
+        "ex_button": False,
+        "ex_additional": False,
+        "ex_selector_combo": False,
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+    "sim cancel": {
+        "ex_selector_combo": True,
+        "ex_button": True,
+        "ex_additional": True,
         # Post-proccessing is enabled on cancel, to evaluate only currently exported parts
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
-    elif config == "sim finished":
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
-    elif config == "sim error":
-        widgets["ex_selector_combo"].setEnabled(True)
-        widgets["ex_button"].setEnabled(True)
-        widgets["ex_additional"].setEnabled(True)
-    elif config == "export start":
-        widgets['post_proc_partvtk_button'].setEnabled(False)
-        widgets['post_proc_computeforces_button'].setEnabled(False)
-        widgets['post_proc_floatinginfo_button'].setEnabled(False)
-        widgets['post_proc_measuretool_button'].setEnabled(False)
-        widgets['post_proc_isosurface_button'].setEnabled(False)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(False)
-    elif config == "export cancel":
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
-    elif config == "export finished":
-        widgets['post_proc_partvtk_button'].setEnabled(True)
-        widgets['post_proc_computeforces_button'].setEnabled(True)
-        widgets['post_proc_floatinginfo_button'].setEnabled(True)
-        widgets['post_proc_measuretool_button'].setEnabled(True)
-        widgets['post_proc_isosurface_button'].setEnabled(True)
-        widgets['post_proc_boundaryvtk_button'].setEnabled(True)
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+    "sim finished": {
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+    "sim error": {
+        "ex_selector_combo": True,
+        "ex_button": True,
+        "ex_additional": True,
+    },
+    "export start": {
+        "post_proc_partvtk_button": False,
+        "post_proc_computeforces_button": False,
+        "post_proc_floatinginfo_button": False,
+        "post_proc_measuretool_button": False,
+        "post_proc_isosurface_button": False,
+        "post_proc_boundaryvtk_button": False,
+    },
+    "export cancel": {
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+    "export finished": {
+        "post_proc_partvtk_button": True,
+        "post_proc_computeforces_button": True,
+        "post_proc_floatinginfo_button": True,
+        "post_proc_measuretool_button": True,
+        "post_proc_isosurface_button": True,
+        "post_proc_boundaryvtk_button": True,
+    },
+}
+
+
+def widget_state_config(widgets, config):
+    """ Takes an widget dictionary and a config string (or a list of them, applied in order)
+        to enable and disable certain widgets base on a case.
+        All the changes are applied in a single pass, without repainting in between. """
+    configs = [config] if isinstance(config, basestring) else config
+    target_states = dict()
+    for each in configs:
+        target_states.update(WIDGET_STATES[each])
+
+    # Only the DSPH dock is frozen, the rest of FreeCAD (3D view included) keeps painting
+    dsph_dock = get_dsph_dock()
+    if dsph_dock is not None:
+        dsph_dock.setUpdatesEnabled(False)
+    try:
+        for widget_name, enabled in target_states.iteritems():
+            widgets[widget_name].setEnabled(enabled)
+    finally:
+        if dsph_dock is not None:
+            dsph_dock.setUpdatesEnabled(True)
+
+
+def get_dsph_dock():
+    """ Returns the DSPH main dock docked in the FreeCAD main window, or None if it is not docked yet.
+    The dock is looked up again only when the cached one was taken out of the window. """
+    global _dsph_dock
+    try:
+        docked = _dsph_dock is not None and _dsph_dock.parent() is not None
+    except RuntimeError:
+        # The Qt side of the cached dock was already deleted
+        docked = False
+    if not docked:
+        _dsph_dock = FreeCADGui.getMainWindow().findChild(QtGui.QDockWidget, "DSPH Widget")
+    return _dsph_dock
 
 
 def case_summary(orig_data):
@@ -1701,29 +1778,26 @@ def case_summary(orig_data):
     if len(data['simobjects']) > 1:
         data['objects_info'] += "<ul>"
         # data['simobjects'] is a dict with format
-        # {'key': ['mk', 'type', 'fill']} where key is an internal name.
+        # {'key': SimObject} where key is an internal name.
         for key, value in data['simobjects'].iteritems():
             if key.lower() == 'case_limits':
                 continue
             fc_object = utils.get_fc_object(key)
             is_floating = utils.__('Yes') if str(
-                value[0]) in data['floating_mks'].keys() else utils.__('No')
-            is_floating = utils.__('No') if value[
-                1].lower() == "fluid" else is_floating
+                value.mk) in data['floating_mks'] else utils.__('No')
+            is_floating = utils.__('No') if value.is_fluid else is_floating
             has_initials = utils.__('Yes') if str(
-                value[0]) in data['initials_mks'].keys() else utils.__('No')
-            has_initials = utils.__('No') if value[
-                1].lower() == "bound" else has_initials
-            real_mk = value[0] + 11 if value[
-                1].lower() == "bound" else value[0] + 1
+                value.mk) in data['initials_mks'] else utils.__('No')
+            has_initials = utils.__('No') if value.is_bound else has_initials
+            real_mk = value.mk + 11 if value.is_bound else value.mk + 1
             data['objects_info'] += "<li><b>{label}</b> (<i>{iname}</i>): <br/>" \
                                     "Type: {type} (MK{type}: <b>{mk}</b> ; MK: <b>{real_mk}</b>)<br/>" \
                                     "Fill mode: {fillmode}<br/>" \
                                     "Floating: {floats}<br/>" \
                                     "Initials: {initials}</li><br/>".format(label=fc_object.Label, iname=key,
-                                                                            type=value[1].title(), mk=value[0],
+                                                                            type=value.type.title(), mk=value.mk,
                                                                             real_mk=str(real_mk),
-                                                                            fillmode=value[2].title(),
+                                                                            fillmode=value.fill.title(),
                                                                             floats=is_floating,
                                                                             initials=has_initials)
         data['objects_info'] += "</ul>"
@@ -1758,10 +1832,10 @@ def case_summary(orig_data):
     data['mkboundused'] = list()
     data['mkfluidused'] = list()
     for element in data['simobjects'].values():
-        if element[1].lower() == 'bound':
-            data['mkboundused'].append(str(element[0]))
-        elif element[1].lower() == 'fluid':
-            data['mkfluidused'].append(str(element[0]))
+        if element.is_bound:
+            data['mkboundused'].append(str(element.mk))
+        elif element.is_fluid:
+            data['mkfluidused'].append(str(element.mk))
 
     data['mkboundused'] = ", ".join(
         data['mkboundused']) if len(data['mkboundused']) > 0 else "None"
@@ -1799,3 +1873,28 @@ def case_summary(orig_data):
 def get_fc_view_object(internal_name):
     """ Returns a FreeCADGui View provider object by a name. """
     return FreeCADGui.getDocument("DSPH_Case").getObject(internal_name)
+
+
+class PartCountNotifier(QtCore.QObject):
+    """ Delivers the result of a PartCountTask to the thread that owns this object (the GUI one).
+    The request id passed to count_parts_in_background is sent along with the count. """
+    counted = QtCore.Signal(int, int)
+
+
+class PartCountTask(QtCore.QRunnable):
+    """ Finds the last Part file of an out folder in a pool thread, emitting it through notifier.counted. """
+
+    def __init__(self, out_path, notifier, request_id):
+        super(PartCountTask, self).__init__()
+        self.out_path = out_path
+        self.notifier = notifier
+        self.request_id = request_id
+
+    def run(self):
+        self.notifier.counted.emit(self.request_id, utils.get_last_part_number(self.out_path))
+
+
+def count_parts_in_background(out_path, notifier, request_id):
+    """ Scans out_path for Part files without blocking the GUI.
+    notifier.counted is emitted with request_id and the count when done. """
+    QtCore.QThreadPool.globalInstance().start(PartCountTask(out_path, notifier, request_id))
@@ -30,6 +30,56 @@ from propenums import *
 # along with DesignSPHysics.  If not, see <http://www.gnu.org/licenses/>.
 
 
+class SimObject(object):
+    """ Simulation related data of an object added to the DSPH case.
+
+    Stored in data['simobjects'], keyed by the FreeCAD internal name. The name
+    is not stored again here: the key already holds it for every lookup.
+    Type and fill are stored in lower case, so they can be compared directly.
+
+    Attributes:
+        mk: Mk group of the object (mkbound or mkfluid, depending on type)
+        type: Object type. 'bound', 'fluid' or 'typespecial' for Case_Limits
+        fill: Fill mode. 'full', 'solid', 'face', 'wire' or 'fillspecial' for Case_Limits
+        is_fluid: True if the type is 'fluid'. Updated when type changes.
+        is_bound: True if the type is 'bound'. Updated when type changes.
+    """
+
+    __slots__ = ("mk", "_type", "_fill", "is_fluid", "is_bound")
+
+    def __init__(self, mk=-1, type="bound", fill="full"):
+        self.mk = mk
+        self.type = type
+        self.fill = fill
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, value):
+        self._type = value.lower()
+        self.is_fluid = self._type == "fluid"
+        self.is_bound = self._type == "bound"
+
+    @property
+    def fill(self):
+        return self._fill
+
+    @fill.setter
+    def fill(self, value):
+        self._fill = value.lower()
+
+    def __getstate__(self):
+        return self.mk, self.type, self.fill
+
+    def __setstate__(self, state):
+        self.mk, self.type, self.fill = state
+
+    def __repr__(self):
+        return "SimObject(mk={!r}, type={!r}, fill={!r})".format(self.mk, self.type, self.fill)
+
+
 class FloatProperty(object):
     """ Float property of an DSPH object.
 
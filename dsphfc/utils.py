@@ -16,19 +16,22 @@ import Mesh
 import Draft
 import math
 import os
-import pickle
 import random
+import shlex
 import tempfile
 import traceback
-import webbrowser
 import json
 from sys import platform
 from datetime import datetime
 
 from PySide import QtGui, QtCore
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 import guiutils
-import stl
 from properties import *
 
 """
@@ -56,13 +59,16 @@ FREECAD_MIN_VERSION = "016"
 APP_NAME = "DesignSPHysics"
 DEBUGGING = True
 DIVIDER = 1000
-PICKLE_PROTOCOL = 1  # Binary mode
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL  # Binary mode, fastest available
 VERSION = "0.4.1707-26 (Stable)"
 WIDTH_2D = 0.001
 MAX_PARTICLE_WARNING = 2000000
 
 # ------ END CONSTANTS DEFINITION ------
 
+# Handle of the DSPH_Case document, see get_dsph_document()
+_dsph_document = None
+
 
 def is_compatible_version():
     """ Checks if the current FreeCAD version is suitable
@@ -277,6 +283,18 @@ def float_list_to_float_property(floating_mks):
     return to_ret
 
 
+def simobjects_list_to_simobject(simobjects):
+    """ Transforms simobjects stored as [mk, type, fill] lists (previous versions) into SimObject instances. """
+    to_ret = dict()
+    for key, value in simobjects.iteritems():
+        if isinstance(value, list):
+            # Is in old mode. Change to OOP
+            to_ret[key] = SimObject(*value)
+        else:
+            to_ret[key] = value
+    return to_ret
+
+
 def initials_list_to_initials_property(initials_mks):
     to_ret = dict()
     for key, value in initials_mks.iteritems():
@@ -383,12 +401,13 @@ def get_default_data():
     # Stores project path and name for future script needs
     data['project_path'] = ""
     data['project_name'] = ""
+    data['out_path'] = ""  # <project_path>/<project_name>_Out/, kept in sync on save and load
     data['total_particles'] = -1
     data['total_particles_out'] = 0
     data['additional_parameters'] = ""
     data['export_options'] = ""
-    data["mkboundused"] = []
-    data["mkfluidused"] = []
+    data["mkboundused"] = set()
+    data["mkfluidused"] = set()
 
     """ Dictionary that defines floatings.
         Structure: {mk: FloatProperty} """
@@ -431,7 +450,9 @@ def get_default_data():
     temp_data['measuretool_points'] = list()
     temp_data['measuretool_grid'] = list()
     temp_data['current_output'] = ""
-    temp_data['supported_types'] = ["Part::Box", "Part::Sphere", "Part::Cylinder"]
+    temp_data['supported_types'] = frozenset(["Part::Box", "Part::Sphere", "Part::Cylinder"])
+    # (object count, last object name) of the case document when it was last checked for deletions
+    temp_data['document_signature'] = None
 
     # Try to load saved paths. This way the user does not need
     # to introduce the software paths every time
@@ -480,14 +501,14 @@ def get_first_mk_not_used(objtype, data):
         endval = 10
         mkset = set()
         for key, value in data["simobjects"].iteritems():
-            if value[1].lower() == "fluid":
-                mkset.add(value[0])
+            if value.is_fluid:
+                mkset.add(value.mk)
     else:
         endval = 240
         mkset = set()
         for key, value in data["simobjects"].iteritems():
-            if value[1].lower() == "bound":
-                mkset.add(value[0])
+            if value.is_bound:
+                mkset.add(value.mk)
     for i in range(0, endval):
         if i not in mkset:
             return i
@@ -495,9 +516,19 @@ def get_first_mk_not_used(objtype, data):
 
 def open_help():
     """ Opens a web browser with this software help. """
+    import webbrowser
     webbrowser.open("http://design.sphysics.org/wiki/")
 
 
+def ensure_dir(path):
+    """ Creates the directory (and its parents) if it does not exist yet. """
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
 def get_os():
     """ Returns the current operating system """
     return platform
@@ -617,18 +648,18 @@ def dump_to_xml(data, save_name):
     # Export in strict order
     for key in data["export_order"]:
         name = key
-        valuelist = data["simobjects"][name]
-        o = FreeCAD.getDocument("DSPH_Case").getObject(name)
+        sim_object = data["simobjects"][name]
+        o = get_dsph_document().getObject(name)
         # Ignores case limits
         if name != "Case_Limits":
             # Sets MKfluid or bound depending on object properties and resets
             # the matrix
             f.write('\t\t\t\t\t<matrixreset />\n')
-            if valuelist[1].lower() == "fluid":
-                f.write('\t\t\t\t\t<setmkfluid mk="' + str(valuelist[0]) + '"/>\n')
-            elif valuelist[1].lower() == "bound":
-                f.write('\t\t\t\t\t<setmkbound mk="' + str(valuelist[0]) + '"/>\n')
-            f.write('\t\t\t\t\t<setdrawmode mode="' + valuelist[2].lower() + '"/>\n')
+            if sim_object.is_fluid:
+                f.write('\t\t\t\t\t<setmkfluid mk="' + str(sim_object.mk) + '"/>\n')
+            elif sim_object.is_bound:
+                f.write('\t\t\t\t\t<setmkbound mk="' + str(sim_object.mk) + '"/>\n')
+            f.write('\t\t\t\t\t<setdrawmode mode="' + sim_object.fill + '"/>\n')
             """ Exports supported objects in a xml parametric mode.
             If special objects are found, exported in an specific manner (p.e FillBox)
             The rest of the things are exported in STL format."""
@@ -665,7 +696,7 @@ def dump_to_xml(data, save_name):
                 f.write('\t\t\t\t\t</drawcylinder>\n')
             else:
                 # Watch if it is a fillbox group
-                if o.TypeId == "App::DocumentObjectGroup" and "fillbox" in o.Name.lower():
+                if is_fillbox(o):
                     filllimits = None
                     fillpoint = None
                     for element in o.OutList:
@@ -1164,32 +1195,78 @@ def get_number_of_documents():
     return len(FreeCAD.listDocuments())
 
 
+def split_parameters(parameters):
+    """ Splits a command line parameter string into a list of arguments.
+    Quoted values are kept as a single argument. Backslashes are not
+    treated as escapes so Windows paths are preserved. Unbalanced
+    quotes fall back to a plain whitespace split. """
+    # shlex only handles byte strings, so unicode is lexed as UTF-8 and decoded back
+    is_unicode = isinstance(parameters, unicode)
+    lexer = shlex.shlex(parameters.encode("utf-8") if is_unicode else parameters, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return parameters.split()
+    return [token.decode("utf-8") for token in tokens] if is_unicode else tokens
+
+
+def get_last_part_number(out_path):
+    """ Returns the number of the last Part_XXXX.bi4 file in the out folder passed, or -1 if there is none.
+    Scans the directory listing once, without globbing or stat calls. """
+    last_part = -1
+    try:
+        file_names = os.listdir(out_path)
+    except OSError:
+        return last_part
+    for file_name in file_names:
+        if file_name.startswith("Part_") and file_name.endswith(".bi4"):
+            try:
+                part_number = int(file_name[5:-4])
+            except ValueError:
+                continue
+            if part_number > last_part:
+                last_part = part_number
+    return last_part
+
+
+def get_last_part_in_output(output, prefix, suffix):
+    """ Returns the part number of the last <prefix><number><suffix> occurrence in a tool output, or None.
+    The output is searched backwards, so only the most recent part is parsed. """
+    start = output.rfind(prefix)
+    while start != -1:
+        number_start = start + len(prefix)
+        end = output.find(suffix, number_start)
+        if end != -1:
+            try:
+                return int(output[number_start:end])
+            except ValueError:
+                pass
+        start = output.rfind(prefix, 0, start)
+    return None
+
+
 def batch_generator(full_path, case_name, gcpath, dsphpath, pvtkpath, exec_params, lib_path):
     """ Loads a windows & linux template for batch files and saves them formatted to disk. """
     lib_folder = os.path.dirname(os.path.realpath(__file__))
-    with open('{}/templates/template.bat'.format(lib_folder), 'r') as content_file:
-        win_template = content_file.read().format(app_name=APP_NAME,
-                                                  case_name=case_name.encode('utf-8'),
-                                                  gcpath=gcpath,
-                                                  dsphpath=dsphpath,
-                                                  pvtkpath=pvtkpath,
-                                                  exec_params=exec_params)
-    with open('{}/templates/template.sh'.format(lib_folder), 'r') as content_file:
-        linux_template = content_file.read().format(app_name=APP_NAME,
-                                                    case_name=case_name.encode('utf-8'),
-                                                    gcpath=gcpath,
-                                                    dsphpath=dsphpath,
-                                                    pvtkpath=pvtkpath,
-                                                    exec_params=exec_params,
-                                                    lib_path=lib_path,
-                                                    name="name")
-
-    with open(full_path + "/run.bat", 'w') as bat_file:
-        log(__("Creating ") + full_path + "/run.bat")
-        bat_file.write(win_template)
-    with open(full_path + "/run.sh", 'w') as bat_file:
-        log(__("Creating ") + full_path + "/run.sh")
-        bat_file.write(linux_template)
+    # Both templates are formatted with the same parameters. Unused ones are ignored.
+    template_params = dict(app_name=APP_NAME,
+                           case_name=case_name.encode('utf-8'),
+                           gcpath=gcpath,
+                           dsphpath=dsphpath,
+                           pvtkpath=pvtkpath,
+                           exec_params=exec_params,
+                           lib_path=lib_path,
+                           name="name")
+
+    for extension in ["bat", "sh"]:
+        with open('{}/templates/template.{}'.format(lib_folder, extension), 'r') as content_file:
+            script = content_file.read().format(**template_params)
+        script_path = full_path + "/run." + extension
+        with open(script_path, 'w') as script_file:
+            log(__("Creating ") + script_path)
+            script_file.write(script)
 
 
 def import_stl(filename=None, scale_x=1, scale_y=1, scale_z=1, name=None):
@@ -1204,6 +1281,8 @@ def import_stl(filename=None, scale_x=1, scale_y=1, scale_z=1, name=None):
 
     if not filename:
         raise RuntimeError("STL Import: file cannot be None")
+    # numpy-stl pulls numpy in, so it is only loaded when an STL is imported.
+    import stl
     try:
         target = stl.Mesh.from_file(filename)
     except Exception as e:
@@ -1223,6 +1302,28 @@ def import_stl(filename=None, scale_x=1, scale_y=1, scale_z=1, name=None):
     FreeCADGui.SendMsgToActiveView("ViewFit")
 
 
+def get_dsph_document():
+    """ Returns the DSPH_Case FreeCAD document. Raises NameError if it is not opened.
+    The handle is cached and only looked up again once that document is closed. """
+    global _dsph_document
+    if _dsph_document is not None:
+        try:
+            if _dsph_document.Name == "DSPH_Case":
+                return _dsph_document
+        except ReferenceError:
+            # The document was closed
+            pass
+    _dsph_document = None
+    _dsph_document = FreeCAD.getDocument("DSPH_Case")
+    return _dsph_document
+
+
 def get_fc_object(internal_name):
     """ Returns a FreeCAD internal object by a name. """
-    return FreeCAD.getDocument("DSPH_Case").getObject(internal_name)
+    return get_dsph_document().getObject(internal_name)
+
+
+def is_fillbox(fc_object):
+    """ Returns whether a FreeCAD object is a fillbox group.
+    The cheap type check goes first so the name is only lowered for groups. """
+    return fc_object.TypeId == "App::DocumentObjectGroup" and "fillbox" in fc_object.Name.lower()
@@ -11,10 +11,7 @@ a dictionary.
 import FreeCAD
 import FreeCADGui
 import Mesh
-import json
-import sys
 import utils
-import xmltodict
 import xml.etree.ElementTree as ElementTree
 
 """
@@ -38,234 +35,256 @@ along with DesignSPHysics.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
+# <constantsdef> elements read from their value attribute
+CONSTANT_VALUE_KEYS = ('rhop0', 'hswl', 'gamma', 'speedsystem', 'coefsound', 'speedsound',
+                       'coefh', 'cflnumber', 'h', 'b', 'massbound', 'massfluid')
+# <constantsdef> elements that also have an auto attribute
+CONSTANT_AUTO_KEYS = ('hswl', 'speedsystem', 'speedsound', 'h', 'b', 'massbound', 'massfluid')
+# XML lengths are in meters, FreeCAD ones in millimeters
+MM_PER_M = 1000.0
+
+
 def import_xml_file(filename):
     """ Returns data dictionary with values found
         in a GenCase/DSPH compatible XML file and a
        list of objects to add to simulation """
 
-    with open(filename, "rb") as target_file:
-        target_xml = target_file.read().replace('\n', '')
+    # The file is parsed once, streamed by expat, and the same tree is used for data and objects
+    with open(filename, "rb") as xml_file:
+        root = ElementTree.parse(xml_file).getroot()
 
     # Path to xml folder
     path = "/".join(filename.split("/")[0:-1])
 
-    # Converts XML in python dictionary
-    raw_data = json.loads(json.dumps(xmltodict.parse(target_xml)))
-
     try:
-        config = filter_data(raw_data)
-    except:
+        config = filter_data(root)
+    except (AttributeError, TypeError, ValueError):
+        # Missing element/attribute or value that can't be converted
         config = dict()
 
-    objects = create_fc_objects(target_xml, path)
+    objects = create_fc_objects(root, path)
 
     return config, objects
 
 
-def filter_data(raw):
-    """ Filters a raw json representing an XML file to
+def filter_data(root):
+    """ Filters the root <case> element of an XML file to
         a compatible data dictionary. """
 
     fil = dict()
 
+    constants = root.find("./casedef/constantsdef")
+    definition = root.find("./casedef/geometry/definition")
+
+    def constant(tag, attribute="value"):
+        return constants.find(tag).get(attribute)
+
     # Case constants related code
-    fil['lattice_bound'] = int(raw['case']['casedef']['constantsdef']['lattice']['@bound'])
-    fil['lattice_fluid'] = int(raw['case']['casedef']['constantsdef']['lattice']['@fluid'])
-    fil['gravity'] = [float(raw['case']['casedef']['constantsdef']['gravity']['@x']),
-                      float(raw['case']['casedef']['constantsdef']['gravity']['@y']),
-                      float(raw['case']['casedef']['constantsdef']['gravity']['@z'])]
-    fil['rhop0'] = float(raw['case']['casedef']['constantsdef']['rhop0']['@value'])
-    fil['hswl'] = float(raw['case']['casedef']['constantsdef']['hswl']['@value'])
-    fil['hswl_auto'] = raw['case']['casedef']['constantsdef']['hswl']['@auto'].lower() == "true"
-    fil['gamma'] = float(raw['case']['casedef']['constantsdef']['gamma']['@value'])
-    fil['speedsystem'] = float(raw['case']['casedef']['constantsdef']['speedsystem']['@value'])
-    fil['speedsystem_auto'] = raw['case']['casedef']['constantsdef']['speedsystem']['@auto'].lower() == "true"
-    fil['coefsound'] = float(raw['case']['casedef']['constantsdef']['coefsound']['@value'])
-    fil['speedsound'] = float(raw['case']['casedef']['constantsdef']['speedsound']['@value'])
-    fil['speedsound_auto'] = raw['case']['casedef']['constantsdef']['speedsound']['@auto'].lower() == "true"
-    fil['coefh'] = float(raw['case']['casedef']['constantsdef']['coefh']['@value'])
-    fil['cflnumber'] = float(raw['case']['casedef']['constantsdef']['cflnumber']['@value'])
-    fil['h'] = float(raw['case']['casedef']['constantsdef']['h']['@value'])
-    fil['h_auto'] = raw['case']['casedef']['constantsdef']['h']['@auto'].lower() == "true"
-    fil['b'] = float(raw['case']['casedef']['constantsdef']['b']['@value'])
-    fil['b_auto'] = raw['case']['casedef']['constantsdef']['b']['@auto'].lower() == "true"
-    fil['massbound'] = float(raw['case']['casedef']['constantsdef']['massbound']['@value'])
-    fil['massbound_auto'] = raw['case']['casedef']['constantsdef']['massbound']['@auto'].lower() == "true"
-    fil['massfluid'] = float(raw['case']['casedef']['constantsdef']['massfluid']['@value'])
-    fil['massfluid_auto'] = raw['case']['casedef']['constantsdef']['massbound']['@auto'].lower() == "true"
+    fil['lattice_bound'] = int(constant('lattice', 'bound'))
+    fil['lattice_fluid'] = int(constant('lattice', 'fluid'))
+    fil['gravity'] = [float(constant('gravity', 'x')),
+                      float(constant('gravity', 'y')),
+                      float(constant('gravity', 'z'))]
+    for key in CONSTANT_VALUE_KEYS:
+        fil[key] = float(constant(key))
+    for key in CONSTANT_AUTO_KEYS:
+        fil[key + '_auto'] = constant(key, 'auto').lower() == "true"
 
     # Getting dp
-    fil['dp'] = float(raw['case']['casedef']['geometry']['definition']['@dp'])
+    fil['dp'] = float(definition.get('dp'))
 
     # Getting case limits
-    fil['limits_min'] = [float(raw['case']['casedef']['geometry']['definition']['pointmin']['@x']),
-                         float(raw['case']['casedef']['geometry']['definition']['pointmin']['@y']),
-                         float(raw['case']['casedef']['geometry']['definition']['pointmin']['@z'])]
-    fil['limits_max'] = [float(raw['case']['casedef']['geometry']['definition']['pointmax']['@x']),
-                         float(raw['case']['casedef']['geometry']['definition']['pointmax']['@y']),
-                         float(raw['case']['casedef']['geometry']['definition']['pointmax']['@z'])]
+    pointmin = definition.find('pointmin')
+    pointmax = definition.find('pointmax')
+    fil['limits_min'] = [float(pointmin.get('x')), float(pointmin.get('y')), float(pointmin.get('z'))]
+    fil['limits_max'] = [float(pointmax.get('x')), float(pointmax.get('y')), float(pointmax.get('z'))]
 
     # Execution parameters related code
-    execution_parameters = raw['case']['execution']['parameters']['parameter']
-    for parameter in execution_parameters:
-        if '#' in parameter['@key']:
-            fil[parameter['@key'].replace('#', '').lower()] = float(parameter['@value'])
-            fil[parameter['@key'].replace('#', '').lower() + "_auto"] = True
+    for parameter in root.findall("./execution/parameters/parameter"):
+        key = parameter.get('key')
+        if '#' in key:
+            fil[key.replace('#', '').lower()] = float(parameter.get('value'))
+            fil[key.replace('#', '').lower() + "_auto"] = True
         else:
-            fil[parameter['@key'].lower()] = float(parameter['@value'])
+            fil[key.lower()] = float(parameter.get('value'))
 
     # Finding used mkfluids and mkbounds
-    fil['mkboundused'] = []
-    fil['mkfluidused'] = []
-    try:
-        mkbounds = raw['case']['casedef']['geometry']['commands']['mainlist']['setmkbound']
-        if isinstance(mkbounds, dict):
-            # Only one mkfluid statement
-            fil['mkboundused'].append(int(mkbounds['@mk']))
-        else:
-            # Multiple mkfluids
-            for setmkbound in mkbounds:
-                fil['mkboundused'].append(int(setmkbound['@mk']))
-    except KeyError:
-        # No mkbounds found
-        pass
-    try:
-        mkfluids = raw['case']['casedef']['geometry']['commands']['mainlist']['setmkfluid']
-        if isinstance(mkfluids, dict):
-            # Only one mkfluid statement
-            fil['mkfluidused'].append(int(mkfluids['@mk']))
-        else:
-            # Multiple mkfluids
-            for setmkfluid in mkfluids:
-                fil['mkfluidused'].append(int(setmkfluid['@mk']))
-    except KeyError:
-        # No mkfluids found
-        pass
+    fil['mkboundused'] = set(int(setmkbound.get('mk')) for setmkbound in
+                             root.findall("./casedef/geometry/commands/mainlist/setmkbound"))
+    fil['mkfluidused'] = set(int(setmkfluid.get('mk')) for setmkfluid in
+                             root.findall("./casedef/geometry/commands/mainlist/setmkfluid"))
 
     return fil
 
 
-def create_fc_objects(f, path):
-    """ Creates supported objects on scene. Iterates over
-        <mainlist> items and tries to recreate the commands in
-        the current opened scene. """
-    movement = (0.0, 0.0, 0.0)
-    rotation = (0.0, 0.0, 0.0, 0.0)
-    mk = ("void", "0")
-    drawmode = "full"
-    elementnum = 0
-    to_add_dsph = dict()
-
-    root = ElementTree.fromstring(f)
-    mainlist = root.findall("./casedef/geometry/commands/mainlist/*")
-    for command in mainlist:
-        if command.tag == "matrixreset":
-            movement = (0.0, 0.0, 0.0)
-            rotation = (0.0, 0.0, 0.0, 0.0)
-            pass
-        elif command.tag == "setmkfluid":
-            mk = ("fluid", command.attrib["mk"])
-            pass
-        elif command.tag == "setmkbound":
-            mk = ("bound", command.attrib["mk"])
-            pass
-        elif command.tag == "setdrawmode":
-            drawmode = command.attrib["mode"]
-        elif command.tag == "move":
-            movement = (float(command.attrib["x"]), float(command.attrib["y"]), float(command.attrib["z"]))
-        elif command.tag == "rotate":
-            rotation = (float(command.attrib["ang"]), float(command.attrib["x"]), float(command.attrib["y"]),
-                        float(command.attrib["z"]))
-        elif command.tag == "drawbox":
-            for subcommand in command:
-                point = (0.0, 0.0, 0.0)
-                size = (1.0, 1.0, 1.0)
-                if subcommand.tag == "boxfill":
-                    pass
-                elif subcommand.tag == "point":
-                    point = (
-                        float(subcommand.attrib["x"]), float(subcommand.attrib["y"]), float(subcommand.attrib["z"]))
-                elif subcommand.tag == "size":
-                    size = (float(subcommand.attrib["x"]), float(subcommand.attrib["y"]), float(subcommand.attrib["z"]))
-                else:
-                    utils.warning(
-                        "Modifier unknown (" + subcommand.tag + ") for the command: " + command.tag + ". Ignoring...")
-            # Box creation in FreeCAD
-            FreeCAD.ActiveDocument.addObject("Part::Box", "Box" + str(elementnum))
-            FreeCAD.ActiveDocument.ActiveObject.Label = "Box" + str(elementnum)
-            # noinspection PyArgumentList
-            FreeCAD.ActiveDocument.getObject("Box" + str(elementnum)).Placement = FreeCAD.Placement(
-                FreeCAD.Vector((point[0] + movement[0]) * 1000, (point[1] + movement[1]) * 1000,
-                               (point[2] + movement[2]) * 1000),
-                FreeCAD.Rotation(FreeCAD.Vector(rotation[1], rotation[2], rotation[3]), rotation[0]))
-            FreeCAD.ActiveDocument.getObject("Box" + str(elementnum)).Length = str(size[0]) + ' m'
-            FreeCAD.ActiveDocument.getObject("Box" + str(elementnum)).Width = str(size[1]) + ' m'
-            FreeCAD.ActiveDocument.getObject("Box" + str(elementnum)).Height = str(size[2]) + ' m'
-            # Suscribe Box for creation in DSPH Objects
-            # Structure: [name] = [mknumber, type, fill]
-            to_add_dsph["Box" + str(elementnum)] = [int(mk[1]), mk[0], drawmode]
-        elif command.tag == "drawcylinder":
-            point = [0, 0, 0]
-            top_point = [0, 0, 0]
-            radius = float(command.attrib["radius"])
-            points_found = 0
-            for subcommand in command:
-                if subcommand.tag == "point":
-                    if points_found == 0:
-                        point = [float(subcommand.attrib["x"]), float(subcommand.attrib["y"]),
-                                 float(subcommand.attrib["z"])]
-                    elif points_found == 1:
-                        top_point = [float(subcommand.attrib["x"]), float(subcommand.attrib["y"]),
-                                     float(subcommand.attrib["z"])]
-                    else:
-                        utils.warning("Found more than two points in a cylinder definition. Ignoring")
-                    points_found += 1
-
-            # Cylinder creation in FreeCAD
-            FreeCAD.ActiveDocument.addObject("Part::Cylinder", "Cylinder" + str(elementnum))
-            FreeCAD.ActiveDocument.ActiveObject.Label = "Cylinder" + str(elementnum)
-            # noinspection PyArgumentList
-            FreeCAD.ActiveDocument.getObject("Cylinder" + str(elementnum)).Placement = FreeCAD.Placement(
-                FreeCAD.Vector((point[0] + movement[0]) * 1000, (point[1] + movement[1]) * 1000,
-                               (point[2] + movement[2]) * 1000),
-                FreeCAD.Rotation(FreeCAD.Vector(rotation[1], rotation[2], rotation[3]), rotation[0]))
-            FreeCAD.ActiveDocument.getObject("Cylinder" + str(elementnum)).Radius = str(radius) + ' m'
-            FreeCAD.ActiveDocument.getObject("Cylinder" + str(elementnum)).Height = (top_point[2] - point[2]) * 1000
-            # Suscribe Cylinder for creation in DSPH Objects
-            # Structure: [name] = [mknumber, type, fill]
-            to_add_dsph["Cylinder" + str(elementnum)] = [int(mk[1]), mk[0], drawmode]
-        elif command.tag == "drawsphere":
-            point = [0, 0, 0]
-            radius = float(command.attrib["radius"])
-            for subcommand in command:
-                if subcommand.tag == "point":
-                    point = [float(subcommand.attrib["x"]), float(subcommand.attrib["y"]),
-                             float(subcommand.attrib["z"])]
-            # Sphere creation in FreeCAD
-            FreeCAD.ActiveDocument.addObject("Part::Sphere", "Sphere" + str(elementnum))
-            FreeCAD.ActiveDocument.ActiveObject.Label = "Sphere" + str(elementnum)
-            # noinspection PyArgumentList
-            FreeCAD.ActiveDocument.getObject("Sphere" + str(elementnum)).Placement = FreeCAD.Placement(
-                FreeCAD.Vector((point[0] + movement[0]) * 1000, (point[1] + movement[1]) * 1000,
-                               (point[2] + movement[2]) * 1000),
-                FreeCAD.Rotation(FreeCAD.Vector(rotation[1], rotation[2], rotation[3]), rotation[0]))
-            FreeCAD.ActiveDocument.getObject("Sphere" + str(elementnum)).Radius = str(radius) + ' m'
-            # Suscribe Sphere for creation in DSPH Objects
-            # Structure: [name] = [mknumber, type, fill]
-            to_add_dsph["Sphere" + str(elementnum)] = [int(mk[1]), mk[0], drawmode]
-        elif command.tag == "drawfilestl":
-            # Imports the stl file as good as it can
-            stl_path = path + "/" + command.attrib["file"]
-            Mesh.insert(stl_path, "DSPH_Case")
-            # TODO: Find a way to reference the mesh imported for adding it to sim.  For now it can't
-            # toAddDSPH["STL" + str(elementnum)] = [int(mk[1]), mk[0], drawmode]
+def _placement(point, ctx):
+    """ Returns the FreeCAD placement for a point, applying the current movement and rotation. """
+    movement = ctx['movement']
+    rotation = ctx['rotation']
+    # noinspection PyArgumentList
+    return FreeCAD.Placement(
+        FreeCAD.Vector((point[0] + movement[0]) * MM_PER_M, (point[1] + movement[1]) * MM_PER_M,
+                       (point[2] + movement[2]) * MM_PER_M),
+        FreeCAD.Rotation(FreeCAD.Vector(rotation[1], rotation[2], rotation[3]), rotation[0]))
+
+
+def _xyz(element):
+    """ Returns the x, y and z attributes of an element as a float tuple. """
+    attrib = element.attrib
+    return float(attrib["x"]), float(attrib["y"]), float(attrib["z"])
+
+
+def _subscribe(fc_object, ctx):
+    """ Subscribes a created object for creation in DSPH Objects with the current mk and draw mode. """
+    # Structure: [name] = [mknumber, type, fill]
+    ctx['to_add_dsph'][fc_object.Name] = [int(ctx['mk'][1]), ctx['mk'][0], ctx['drawmode']]
+
+
+def _on_matrixreset(command, ctx):
+    ctx['movement'] = (0.0, 0.0, 0.0)
+    ctx['rotation'] = (0.0, 0.0, 0.0, 0.0)
+
+
+def _on_setmkfluid(command, ctx):
+    ctx['mk'] = ("fluid", command.attrib["mk"])
+
+
+def _on_setmkbound(command, ctx):
+    ctx['mk'] = ("bound", command.attrib["mk"])
+
+
+def _on_setdrawmode(command, ctx):
+    ctx['drawmode'] = command.attrib["mode"]
+
+
+def _on_move(command, ctx):
+    ctx['movement'] = _xyz(command)
+
+
+def _on_rotate(command, ctx):
+    ctx['rotation'] = (float(command.attrib["ang"]),) + _xyz(command)
+
+
+def _on_drawbox(command, ctx):
+    point = (0.0, 0.0, 0.0)
+    size = (1.0, 1.0, 1.0)
+    for subcommand in command:
+        if subcommand.tag == "boxfill":
             pass
+        elif subcommand.tag == "point":
+            point = _xyz(subcommand)
+        elif subcommand.tag == "size":
+            size = _xyz(subcommand)
         else:
-            # Command not supported, report and ignore
-            utils.warning("The command: " + command.tag + " is not yet supported. Ignoring...")
+            utils.warning(
+                "Modifier unknown (" + subcommand.tag + ") for the command: " + command.tag + ". Ignoring...")
+    # Box creation in FreeCAD
+    box = ctx['doc'].addObject("Part::Box", "Box" + str(ctx['elementnum']))
+    box.Label = "Box" + str(ctx['elementnum'])
+    box.Placement = _placement(point, ctx)
+    # Lengths are set as plain millimeter values, skipping the unit string parsing
+    box.Length = size[0] * MM_PER_M
+    box.Width = size[1] * MM_PER_M
+    box.Height = size[2] * MM_PER_M
+    _subscribe(box, ctx)
+
+
+def _on_drawcylinder(command, ctx):
+    point = (0.0, 0.0, 0.0)
+    top_point = (0.0, 0.0, 0.0)
+    radius = float(command.attrib["radius"])
+    points_found = 0
+    for subcommand in command:
+        if subcommand.tag == "point":
+            if points_found == 0:
+                point = _xyz(subcommand)
+            elif points_found == 1:
+                top_point = _xyz(subcommand)
+            else:
+                utils.warning("Found more than two points in a cylinder definition. Ignoring")
+            points_found += 1
+    # Cylinder creation in FreeCAD
+    cylinder = ctx['doc'].addObject("Part::Cylinder", "Cylinder" + str(ctx['elementnum']))
+    cylinder.Label = "Cylinder" + str(ctx['elementnum'])
+    cylinder.Placement = _placement(point, ctx)
+    cylinder.Radius = radius * MM_PER_M
+    cylinder.Height = (top_point[2] - point[2]) * MM_PER_M
+    _subscribe(cylinder, ctx)
+
+
+def _on_drawsphere(command, ctx):
+    point = (0.0, 0.0, 0.0)
+    radius = float(command.attrib["radius"])
+    for subcommand in command:
+        if subcommand.tag == "point":
+            point = _xyz(subcommand)
+    # Sphere creation in FreeCAD
+    sphere = ctx['doc'].addObject("Part::Sphere", "Sphere" + str(ctx['elementnum']))
+    sphere.Label = "Sphere" + str(ctx['elementnum'])
+    sphere.Placement = _placement(point, ctx)
+    sphere.Radius = radius * MM_PER_M
+    _subscribe(sphere, ctx)
 
-        elementnum += 1
 
-    FreeCAD.ActiveDocument.recompute()
+def _on_drawfilestl(command, ctx):
+    # Imports the stl file as good as it can
+    stl_path = ctx['path'] + "/" + command.attrib["file"]
+    Mesh.insert(stl_path, "DSPH_Case")
+    # TODO: Find a way to reference the mesh imported for adding it to sim.  For now it can't
+    # toAddDSPH["STL" + str(elementnum)] = [int(mk[1]), mk[0], drawmode]
+
+
+def _on_unsupported(command, ctx):
+    # Command not supported, report and ignore
+    utils.warning("The command: " + command.tag + " is not yet supported. Ignoring...")
+
+
+# <mainlist> command tag -> handler. Handlers receive the command element and the parsing context.
+COMMAND_HANDLERS = {
+    "matrixreset": _on_matrixreset,
+    "setmkfluid": _on_setmkfluid,
+    "setmkbound": _on_setmkbound,
+    "setdrawmode": _on_setdrawmode,
+    "move": _on_move,
+    "rotate": _on_rotate,
+    "drawbox": _on_drawbox,
+    "drawcylinder": _on_drawcylinder,
+    "drawsphere": _on_drawsphere,
+    "drawfilestl": _on_drawfilestl
+}
+
+
+def create_fc_objects(root, path):
+    """ Creates supported objects on scene. Iterates over
+        <mainlist> items of the root <case> element and tries
+        to recreate the commands in the current opened scene. """
+    doc = FreeCAD.ActiveDocument
+    # Parsing state shared by the command handlers
+    ctx = {
+        'doc': doc,
+        'path': path,
+        'movement': (0.0, 0.0, 0.0),
+        'rotation': (0.0, 0.0, 0.0, 0.0),
+        'mk': ("void", "0"),
+        'drawmode': "full",
+        'elementnum': 0,
+        'to_add_dsph': dict()
+    }
+
+    # All the objects are created in one undo step
+    doc.openTransaction("Import XML")
+    mainlist = root.findall("./casedef/geometry/commands/mainlist/*")
+    try:
+        for command in mainlist:
+            COMMAND_HANDLERS.get(command.tag, _on_unsupported)(command, ctx)
+            ctx['elementnum'] += 1
+    except Exception:
+        # Malformed command (missing attribute, bad number...). Undo the partial import
+        utils.error("Could not import the XML command number " + str(ctx['elementnum']) + ". Import aborted")
+        doc.abortTransaction()
+        raise
+
+    doc.commitTransaction()
+    doc.recompute()
     FreeCADGui.SendMsgToActiveView("ViewFit")
-    return to_add_dsph
+    return ctx['to_add_dsph']